@@ -11,4 +11,58 @@ class Config:
     PRINTER_PORT = get_required_env("PRINTER_PORT")
     TEMP_IMAGE_DIR = get_required_env("TEMP_IMAGE_DIR")
 
+    # IPP transport (see app/printing/async_transport.py)
+    PRINT_TIMEOUT_SECONDS = float(os.getenv("PRINT_TIMEOUT_SECONDS", "30"))
+    PRINTER_MAX_IN_FLIGHT = int(os.getenv("PRINTER_MAX_IN_FLIGHT", "2"))
+
+    # Print history archive (see app/history.py)
+    HISTORY_DIR = os.getenv("HISTORY_DIR", os.path.join(TEMP_IMAGE_DIR, "history"))
+    HISTORY_MAX_BYTES = int(os.getenv("HISTORY_MAX_BYTES", str(50 * 1024 * 1024)))
+
+    # Print-quality/speed profiles (see app/quality.py), picked per request
+    # with options.quality.
+    QUALITY_PROFILES = {
+        # Half-resolution render with smaller text, pixel-doubled to print
+        # width: fastest to render and the shortest note to send.
+        "draft": {"render_scale": 0.5, "font_scale": 0.85, "line_gap_px": 3, "dither": False},
+        # The original pipeline: render at print width, dithered to 1 bit
+        # (notes with a custom width_px are resampled with LANCZOS first).
+        "standard": {},
+        # 2x supersampled render, downsampled with dithering.
+        "high": {"render_scale": 2.0},
+    }
+    DEFAULT_QUALITY_PROFILE = os.getenv("DEFAULT_QUALITY_PROFILE", "standard")
+
+    # Print-request deduplication (see app/idempotency.py).  Responses to
+    # requests with an Idempotency-Key header are kept for the TTL; requests
+    # without one are only deduplicated by payload hash within the (short)
+    # payload window, so deliberate reprints go through.  0 disables it.
+    IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "256"))
+    IDEMPOTENCY_PAYLOAD_WINDOW_SECONDS = float(os.getenv("IDEMPOTENCY_PAYLOAD_WINDOW_SECONDS", "10"))
+    # How long a duplicate waits for the original request before getting 409.
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+
+    # Per-client rate limiting and printer fairness (see app/ratelimit.py).
+    # RATE_LIMIT_PER_MINUTE <= 0 disables limiting.  Clients are identified
+    # as "ip:<remote address>", or as "key:<api key>" when their X-API-Key is
+    # listed in TRUSTED_API_KEYS (comma-separated).  CLIENT_WEIGHTS is a
+    # comma-separated list of "client=weight" pairs using those ids, e.g.
+    # "key:kiosk=4,ip:10.0.0.7=0.5".
+    RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+    RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+    TRUSTED_API_KEYS = os.getenv("TRUSTED_API_KEYS", "")
+    CLIENT_WEIGHTS = os.getenv("CLIENT_WEIGHTS", "")
+
+    # Fonts tried, in order, for characters DejaVuSans has no glyph for.
+    # Comma-separated; missing files are skipped.  Empty uses
+    # DEFAULT_FALLBACK_FONTS in app/rendering/fonts.py.
+    FONT_FALLBACK_CHAIN = os.getenv("FONT_FALLBACK_CHAIN", "")
+
+    # Opt-in request profiling (see app/profiling.py).  Off unless a sample
+    # rate > 0 is set or the X-Profile request header is allowed.
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() in ("1", "true", "yes")
+    PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "20"))
+
 config = Config()
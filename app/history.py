@@ -0,0 +1,218 @@
+"""Append-only, size-capped archive of printed jobs.
+
+Every printed note is appended to the current segment file as one record:
+
+    >II header (metadata length, blob length)
+    metadata   JSON: id, created, list_id, title, content_hash, payload_hash,
+               payload, ...
+    blob       zlib-compressed printer BMP (already 1 bit per pixel)
+
+Segments roll over at ``segment_bytes``; once the archive exceeds
+``max_bytes`` the oldest segments are deleted whole.  An in-memory index
+(by id, time, list id, content hash and payload hash) is rebuilt from the segments on
+start-up, so lookups never scan the files and a reprint is one seek + read.
+
+``content_hash`` is the SHA-256 of the printed BMP, which includes the
+"Printed ..." timestamp, so it only matches byte-identical prints.
+``payload_hash`` is the hash of the request payload (minus options that only
+affect rendering quality) and finds every print of the same list.
+"""
+
+from __future__ import annotations
+
+import bisect
+import glob
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from typing import Any
+
+from app.idempotency import payload_hash
+
+_HEADER = struct.Struct(">II")
+
+
+def canonical_payload_hash(payload: Any) -> str:
+    """Hash *payload* ignoring ``options.quality``, which doesn't change the note's content."""
+    if isinstance(payload, dict) and isinstance(payload.get("options"), dict):
+        options = {k: v for k, v in payload["options"].items() if k != "quality"}
+        payload = {k: v for k, v in payload.items() if k != "options"}
+        if options:
+            payload["options"] = options
+    return payload_hash(payload)
+
+
+class PrintArchive:
+    """Archive of printed jobs stored under *directory*."""
+
+    def __init__(self, directory: str, max_bytes: int, segment_bytes: int | None = None) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes or max(64 * 1024, max_bytes // 8)
+        self._lock = threading.Lock()
+        self._segments: list[int] = []  # segment numbers, oldest first
+        self._by_id: dict[str, tuple[int, int, dict[str, Any]]] = {}  # id -> (segment, offset, meta)
+        self._times: list[tuple[float, str]] = []  # (created, id), sorted
+        self._by_list: dict[str, list[str]] = {}
+        self._by_hash: dict[str, list[str]] = {}
+        self._by_payload: dict[str, list[str]] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def append(self, payload: Any, bmp_data: bytes, list_id: str | None = None) -> dict[str, Any]:
+        """Archive a printed job and return its metadata (including ``id``)."""
+        meta = {
+            "id": uuid.uuid4().hex,
+            "created": time.time(),
+            "list_id": list_id,
+            "title": payload.get("title") if isinstance(payload, dict) else None,
+            "content_hash": hashlib.sha256(bmp_data).hexdigest(),
+            "payload_hash": canonical_payload_hash(payload),
+            "bmp_bytes": len(bmp_data),
+            "payload": payload,
+        }
+        meta_b = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+        blob = zlib.compress(bmp_data, 6)
+        record = _HEADER.pack(len(meta_b), len(blob)) + meta_b + blob
+
+        with self._lock:
+            segment = self._current_segment(len(record))
+            path = self._segment_path(segment)
+            with open(path, "ab") as fh:
+                offset = fh.tell()
+                fh.write(record)
+            self._index(segment, offset, meta)
+            self._evict()
+        return meta
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        """Return the metadata for *job_id*, or ``None``."""
+        with self._lock:
+            entry = self._by_id.get(job_id)
+            return entry[2] if entry else None
+
+    def get_bmp(self, job_id: str) -> bytes | None:
+        """Return the archived printer BMP for *job_id*, or ``None``."""
+        with self._lock:
+            entry = self._by_id.get(job_id)
+            if entry is None:
+                return None
+            segment, offset, _ = entry
+            with open(self._segment_path(segment), "rb") as fh:
+                fh.seek(offset)
+                meta_len, blob_len = _HEADER.unpack(fh.read(_HEADER.size))
+                fh.seek(meta_len, os.SEEK_CUR)
+                blob = fh.read(blob_len)
+        return zlib.decompress(blob)
+
+    def query(
+        self,
+        since: float | None = None,
+        until: float | None = None,
+        list_id: str | None = None,
+        content_hash: str | None = None,
+        payload_hash: str | None = None,
+        limit: int = 50,
+    ) -> list[dict[str, Any]]:
+        """Return matching jobs' metadata (without payloads), newest first."""
+        with self._lock:
+            times = self._times
+            lo = 0 if since is None else bisect.bisect_left(times, since, key=lambda t: t[0])
+            hi = len(times) if until is None else bisect.bisect_right(times, until, key=lambda t: t[0])
+            ids = [job_id for _, job_id in times[lo:hi]]
+            if list_id is not None:
+                wanted = set(self._by_list.get(list_id, ()))
+                ids = [i for i in ids if i in wanted]
+            if content_hash is not None:
+                wanted = set(self._by_hash.get(content_hash, ()))
+                ids = [i for i in ids if i in wanted]
+            if payload_hash is not None:
+                wanted = set(self._by_payload.get(payload_hash, ()))
+                ids = [i for i in ids if i in wanted]
+            out = []
+            for job_id in reversed(ids[-limit:] if limit > 0 else []):
+                meta = self._by_id[job_id][2]
+                out.append({k: v for k, v in meta.items() if k != "payload"})
+            return out
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(os.path.getsize(self._segment_path(s)) for s in self._segments)
+
+    # ------------------------------------------------------------------
+    # Segments and index
+    # ------------------------------------------------------------------
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:08d}.log")
+
+    def _current_segment(self, record_len: int) -> int:
+        if self._segments:
+            last = self._segments[-1]
+            if os.path.getsize(self._segment_path(last)) + record_len <= self.segment_bytes:
+                return last
+            segment = last + 1
+        else:
+            segment = 0
+        self._segments.append(segment)
+        return segment
+
+    def _index(self, segment: int, offset: int, meta: dict[str, Any]) -> None:
+        job_id = meta["id"]
+        self._by_id[job_id] = (segment, offset, meta)
+        # Clocks can step backwards; keep the time index sorted regardless.
+        bisect.insort(self._times, (meta["created"], job_id))
+        if meta.get("list_id") is not None:
+            self._by_list.setdefault(meta["list_id"], []).append(job_id)
+        self._by_hash.setdefault(meta["content_hash"], []).append(job_id)
+        if "payload_hash" not in meta:  # archived before payload hashes were recorded
+            meta["payload_hash"] = canonical_payload_hash(meta.get("payload"))
+        self._by_payload.setdefault(meta["payload_hash"], []).append(job_id)
+
+    def _evict(self) -> None:
+        total = sum(os.path.getsize(self._segment_path(s)) for s in self._segments)
+        while total > self.max_bytes and len(self._segments) > 1:
+            oldest = self._segments.pop(0)
+            path = self._segment_path(oldest)
+            total -= os.path.getsize(path)
+            os.remove(path)
+            dropped = {i for i, (seg, _, _) in self._by_id.items() if seg == oldest}
+            for job_id in dropped:
+                del self._by_id[job_id]
+            self._times = [t for t in self._times if t[1] not in dropped]
+            for index in (self._by_list, self._by_hash, self._by_payload):
+                for key in list(index):
+                    index[key] = [i for i in index[key] if i not in dropped]
+                    if not index[key]:
+                        del index[key]
+
+    def _load(self) -> None:
+        paths = sorted(glob.glob(os.path.join(self.directory, "segment-*.log")))
+        for path in paths:
+            segment = int(os.path.basename(path)[len("segment-") : -len(".log")])
+            self._segments.append(segment)
+            with open(path, "rb") as fh:
+                data = fh.read()
+            offset = 0
+            while offset + _HEADER.size <= len(data):
+                meta_len, blob_len = _HEADER.unpack_from(data, offset)
+                end = offset + _HEADER.size + meta_len + blob_len
+                if end > len(data):
+                    break
+                meta = json.loads(data[offset + _HEADER.size : offset + _HEADER.size + meta_len])
+                self._index(segment, offset, meta)
+                offset = end
+            if offset < len(data):
+                # Torn write at the tail (e.g. crash mid-append): drop it so
+                # later appends stay readable.
+                with open(path, "r+b") as fh:
+                    fh.truncate(offset)
@@ -0,0 +1,159 @@
+"""Request deduplication for the print endpoints.
+
+Clients on flaky networks retry ``POST`` requests, which would otherwise
+re-render and re-print the same note.  A request is identified by its
+``Idempotency-Key`` header or, within a short window, by a hash of its JSON
+payload.  The first request to arrive claims the key; duplicates that arrive
+while it is still running wait for it, and later ones get its successful
+response replayed.  Reusing a key with a different payload is a conflict.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple
+
+# Claim statuses
+ACQUIRED = "acquired"  # caller owns the key; must complete() or release() it
+REPLAY = "replay"  # a previous request succeeded; response is attached
+CONFLICT = "conflict"  # key already used for a different payload
+IN_PROGRESS = "in_progress"  # the original request is still running (wait timed out)
+
+
+class Claim(NamedTuple):
+    status: str
+    response: Any = None
+
+
+class _Pending:
+    __slots__ = ("fingerprint", "done")
+
+    def __init__(self, fingerprint: str) -> None:
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    """Bounded in-memory map of request key → response, with TTL eviction.
+
+    Completed entries expire *ttl_seconds* after they are stored; when the
+    store is full the oldest is evicted first.  Keys being worked on are
+    tracked separately until the owner calls :meth:`complete` or
+    :meth:`release`.  A *ttl_seconds* of zero or less disables the store.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        wait_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.wait_seconds = wait_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, str, Any]] = OrderedDict()
+        self._pending: dict[str, _Pending] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def claim(self, key: str, fingerprint: str) -> Claim:
+        """Claim *key* for a request whose payload hashes to *fingerprint*.
+
+        If another request holds the key, wait up to ``wait_seconds`` for it
+        to finish: replay its response if it succeeded, or take over the key
+        if it failed.  A disabled store always grants the claim.
+        """
+        if not self.enabled:
+            return Claim(ACQUIRED)
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            with self._lock:
+                self._evict_expired()
+                entry = self._entries.get(key)
+                if entry is not None:
+                    _, stored_fingerprint, response = entry
+                    if stored_fingerprint != fingerprint:
+                        return Claim(CONFLICT)
+                    return Claim(REPLAY, response)
+                pending = self._pending.get(key)
+                if pending is None:
+                    self._pending[key] = _Pending(fingerprint)
+                    return Claim(ACQUIRED)
+                if pending.fingerprint != fingerprint:
+                    return Claim(CONFLICT)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not pending.done.wait(remaining):
+                return Claim(IN_PROGRESS)
+
+    def complete(self, key: str, response: Any) -> None:
+        """Store *response* for a claimed *key* and wake any waiters."""
+        if not self.enabled:
+            return
+        with self._lock:
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                return
+            self._entries.pop(key, None)
+            self._entries[key] = (self._clock() + self.ttl_seconds, pending.fingerprint, response)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        pending.done.set()
+
+    def release(self, key: str) -> None:
+        """Give up a claimed *key* without storing anything (e.g. the print failed).
+
+        A no-op if the key was already completed.
+        """
+        with self._lock:
+            pending = self._pending.pop(key, None)
+        if pending is not None:
+            pending.done.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            pending, self._pending = self._pending, {}
+        for p in pending.values():
+            p.done.set()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict_expired()
+            return len(self._entries)
+
+    def _evict_expired(self) -> None:
+        # Entries are kept in insertion order and share one TTL, so expiry
+        # times are monotonic and we can stop at the first live entry.
+        now = self._clock()
+        while self._entries:
+            _, (expires_at, _, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._entries.popitem(last=False)
+
+
+def payload_hash(payload: Any) -> str:
+    """SHA-256 of the canonicalised JSON *payload*."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def request_key(endpoint: str, client_id: str, fingerprint: str, header_key: str | None) -> str:
+    """Build the dedupe key for a request from *client_id* to *endpoint*.
+
+    An explicit ``Idempotency-Key`` header wins; otherwise the key is the
+    payload *fingerprint* itself.  Keys are scoped per client, so one client
+    can neither collide with nor replay another client's requests.
+    """
+    if header_key:
+        return f"{endpoint}:{client_id}:key:{header_key}"
+    return f"{endpoint}:{client_id}:sha256:{fingerprint}"
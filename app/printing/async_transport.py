@@ -0,0 +1,280 @@
+"""Asynchronous IPP transport.
+
+Speaks IPP/2.0 ``Print-Job`` directly over HTTP with asyncio streams, so a
+single worker can keep many jobs in flight across several printers without
+a blocked thread (or an ``ipptool`` process) per job.
+
+- :class:`AsyncIppTransport` — one per printer; ``await send_job(data)``
+  with a per-job timeout and a cap on concurrent jobs.  Cancelling the
+  awaiting task aborts the connection.
+- :func:`send_job_sync` — blocking wrapper for the Flask routes; runs the
+  coroutine on a shared background event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import struct
+import threading
+from typing import Any
+
+# IPP constants (RFC 8010 / 8011)
+_IPP_VERSION = (2, 0)
+_OP_PRINT_JOB = 0x0002
+_TAG_OPERATION = 0x01
+_TAG_JOB = 0x02
+_TAG_END = 0x03
+_TAG_INTEGER = 0x21
+_TAG_URI = 0x45
+_TAG_CHARSET = 0x47
+_TAG_LANGUAGE = 0x48
+_TAG_NAME = 0x42
+_TAG_MIME = 0x49
+
+DEFAULT_DOCUMENT_FORMAT = "image/reverse-encoding-bmp"
+USER_NAME = "sticky-note-printer"
+
+_request_ids = itertools.count(1)
+
+# Extra time send_job_sync allows beyond the transport timeout.
+_SYNC_TIMEOUT_GRACE_SECONDS = 5.0
+
+
+# ---------------------------------------------------------------------------
+# IPP message encoding
+# ---------------------------------------------------------------------------
+
+def _attr(tag: int, name: str, value: bytes) -> bytes:
+    name_b = name.encode("utf-8")
+    return (
+        struct.pack(">BH", tag, len(name_b))
+        + name_b
+        + struct.pack(">H", len(value))
+        + value
+    )
+
+
+def encode_print_job(
+    printer_uri: str,
+    document: bytes,
+    document_format: str = DEFAULT_DOCUMENT_FORMAT,
+    request_id: int = 1,
+) -> bytes:
+    """Build an IPP ``Print-Job`` request with *document* appended.
+
+    Carries the same operation attributes as ``print-job.test``.
+    """
+    header = struct.pack(">BBHI", *_IPP_VERSION, _OP_PRINT_JOB, request_id)
+    attrs = (
+        bytes([_TAG_OPERATION])
+        + _attr(_TAG_CHARSET, "attributes-charset", b"utf-8")
+        + _attr(_TAG_LANGUAGE, "attributes-natural-language", b"en")
+        + _attr(_TAG_URI, "printer-uri", printer_uri.encode("utf-8"))
+        + _attr(_TAG_NAME, "requesting-user-name", USER_NAME.encode("utf-8"))
+        + _attr(_TAG_MIME, "document-format", document_format.encode("utf-8"))
+        + bytes([_TAG_END])
+    )
+    return header + attrs + document
+
+
+def decode_response(body: bytes) -> tuple[int, dict[str, Any]]:
+    """Parse an IPP response into ``(status_code, attributes)``.
+
+    Only integer and string-ish values are decoded; attribute names are
+    flattened across groups (first value wins).
+    """
+    if len(body) < 8:
+        raise RuntimeError("IPP response too short")
+    status = struct.unpack_from(">H", body, 2)[0]
+    attrs: dict[str, Any] = {}
+    pos = 8
+    name = ""
+    while pos < len(body):
+        tag = body[pos]
+        pos += 1
+        if tag == _TAG_END:
+            break
+        if tag < 0x10:  # delimiter: start of a new attribute group
+            continue
+        name_len = struct.unpack_from(">H", body, pos)[0]
+        pos += 2
+        if name_len:
+            name = body[pos : pos + name_len].decode("utf-8", "replace")
+        pos += name_len
+        value_len = struct.unpack_from(">H", body, pos)[0]
+        pos += 2
+        raw = body[pos : pos + value_len]
+        pos += value_len
+        if tag == _TAG_INTEGER or tag == 0x23:  # integer / enum
+            value: Any = struct.unpack(">i", raw)[0]
+        elif 0x41 <= tag <= 0x49:
+            value = raw.decode("utf-8", "replace")
+        else:
+            value = raw
+        attrs.setdefault(name, value)
+    return status, attrs
+
+
+# ---------------------------------------------------------------------------
+# Transport
+# ---------------------------------------------------------------------------
+
+class AsyncIppTransport:
+    """Send print jobs to one IPP printer over asyncio streams."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        path: str = "/ipp/print",
+        timeout: float = 30.0,
+        max_in_flight: int = 2,
+    ) -> None:
+        self.host = host
+        self.port = int(port)
+        self.path = path
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @property
+    def printer_uri(self) -> str:
+        return f"ipp://{self.host}:{self.port}{self.path}"
+
+    async def send_job(
+        self,
+        data: bytes,
+        document_format: str = DEFAULT_DOCUMENT_FORMAT,
+        timeout: float | None = None,
+    ) -> int | None:
+        """Print *data*; return the printer's job id (if it reports one).
+
+        Raises ``TimeoutError`` if waiting for an in-flight slot plus the
+        round trip exceeds *timeout* seconds, and ``RuntimeError`` if the
+        printer rejects the job.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return await asyncio.wait_for(
+            self._send_when_free(data, document_format),
+            self.timeout if timeout is None else timeout,
+        )
+
+    async def _send_when_free(self, data: bytes, document_format: str) -> int | None:
+        async with self._semaphore:
+            return await self._send(data, document_format)
+
+    async def _send(self, data: bytes, document_format: str) -> int | None:
+        payload = encode_print_job(self.printer_uri, data, document_format, next(_request_ids))
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(
+                (
+                    f"POST {self.path} HTTP/1.1\r\n"
+                    f"Host: {self.host}:{self.port}\r\n"
+                    "Content-Type: application/ipp\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    "Connection: close\r\n"
+                    "\r\n"
+                ).encode("ascii")
+                + payload
+            )
+            await writer.drain()
+            body = await _read_http_response(reader)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+        status, attrs = decode_response(body)
+        if status >= 0x0100:
+            message = attrs.get("status-message", "")
+            raise RuntimeError(f"IPP print failed: status 0x{status:04x} {message}".rstrip())
+        return attrs.get("job-id")
+
+
+async def _read_http_response(reader: asyncio.StreamReader) -> bytes:
+    status_line = await reader.readline()
+    parts = status_line.decode("latin-1").split()
+    if len(parts) < 2 or not parts[1].isdigit():
+        raise RuntimeError(f"Bad HTTP response from printer: {status_line!r}")
+    http_status = int(parts[1])
+
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read()
+
+    if http_status != 200:
+        raise RuntimeError(f"IPP print failed: HTTP {http_status}")
+    return body
+
+
+# ---------------------------------------------------------------------------
+# Sync wrapper
+# ---------------------------------------------------------------------------
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_transports: dict[tuple[str, int], AsyncIppTransport] = {}
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared event loop, starting its thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ipp-transport", daemon=True).start()
+        return _loop
+
+
+def get_transport(host: str, port: int, **kwargs: Any) -> AsyncIppTransport:
+    """Return the shared transport for printer ``host:port``."""
+    key = (host, int(port))
+    with _loop_lock:
+        if key not in _transports:
+            _transports[key] = AsyncIppTransport(host, port, **kwargs)
+        return _transports[key]
+
+
+def send_job_sync(
+    transport: AsyncIppTransport,
+    data: bytes,
+    document_format: str = DEFAULT_DOCUMENT_FORMAT,
+) -> int | None:
+    """Blocking ``send_job`` for synchronous callers (e.g. Flask views).
+
+    The job runs on the shared background loop; if the caller is
+    interrupted, the job is cancelled.  ``send_job`` enforces the transport's
+    timeout; the wait here is a backstop in case the loop itself stalls.
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        transport.send_job(data, document_format), _background_loop()
+    )
+    try:
+        return future.result(timeout=transport.timeout + _SYNC_TIMEOUT_GRACE_SECONDS)
+    except BaseException:
+        future.cancel()
+        raise
@@ -1,9 +1,14 @@
 """Printing transport: PNG → BMP conversion and IPP send."""
 
+import struct
 import subprocess
 
+from PIL import Image
+
 from app.config import config
 
+PRINTER_WIDTH_PX = 576
+
 
 def png_to_printer_bmp(png_path: str, bmp_path: str) -> None:
     """Convert a PNG to a printer-compatible BMP3 using ImageMagick."""
@@ -23,6 +28,82 @@ def png_to_printer_bmp(png_path: str, bmp_path: str) -> None:
         raise RuntimeError(f"ImageMagick conversion failed: {result.stderr}")
 
 
+def to_printer_raster(img: Image.Image, dither: bool = True) -> Image.Image:
+    """Scale *img* to the printer width and reduce it to 1 bit.
+
+    With *dither*, resampling goes through greyscale and Floyd–Steinberg
+    dithering (as ImageMagick's ``-monochrome`` does).  Without it, narrower
+    images are upscaled nearest-neighbour (pixel doubling, no filtering) and
+    wider ones are thresholded.
+    """
+    if img.width != PRINTER_WIDTH_PX:
+        height = max(1, round(img.height * PRINTER_WIDTH_PX / img.width))
+        if dither:
+            img = img.convert("L").resize((PRINTER_WIDTH_PX, height), Image.LANCZOS)
+        elif img.width < PRINTER_WIDTH_PX:
+            img = img.convert("1").resize((PRINTER_WIDTH_PX, height), Image.NEAREST)
+        else:
+            img = img.convert("L").resize((PRINTER_WIDTH_PX, height), Image.LANCZOS)
+            return img.convert("1", dither=Image.Dither.NONE)
+    if img.mode != "1":
+        img = img.convert("1", dither=Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE)
+    return img
+
+
+def encode_printer_bmp(img: Image.Image, dither: bool = True) -> bytes:
+    """Encode *img* as the 1-bit, vertically flipped BMP3 the printer expects.
+
+    In-process equivalent of :func:`png_to_printer_bmp`: scale to the printer
+    width, reduce to 1 bit (see :func:`to_printer_raster`), flip, BMP3.  BMP
+    stores rows bottom-up, so after the flip the pixel data is simply the
+    image rows top-down, and Pillow's packed buffer can be written out as-is.
+    """
+    img = to_printer_raster(img, dither)
+
+    width, height = img.size
+    packed = img.tobytes()  # 1 bit per pixel, rows padded to whole bytes
+    row_bytes = (width + 7) // 8
+    stride = (row_bytes + 3) & ~3
+    if stride == row_bytes:
+        pixels = packed  # 576 px = 72 bytes: already 4-byte aligned
+    else:
+        padding = b"\0" * (stride - row_bytes)
+        pixels = b"".join(
+            packed[offset : offset + row_bytes] + padding
+            for offset in range(0, len(packed), row_bytes)
+        )
+
+    palette = b"\x00\x00\x00\x00\xff\xff\xff\x00"  # index 0 black, 1 white
+    data_offset = 14 + 40 + len(palette)
+    file_header = struct.pack("<2sIHHI", b"BM", data_offset + len(pixels), 0, 0, data_offset)
+    info_header = struct.pack(
+        "<IiiHHIIiiII",
+        40,  # header size
+        width,
+        height,  # positive: bottom-up rows
+        1,  # planes
+        1,  # bits per pixel
+        0,  # BI_RGB
+        len(pixels),
+        2835,  # 72 dpi
+        2835,
+        2,  # colours used
+        0,
+    )
+    return file_header + info_header + palette + pixels
+
+
+def image_to_printer_bmp(img: Image.Image, bmp_path: str, dither: bool = True) -> bytes:
+    """Write *img* as a printer-compatible BMP without shelling out to ImageMagick.
+
+    Returns the encoded bytes so callers can send them without re-reading.
+    """
+    data = encode_printer_bmp(img, dither)
+    with open(bmp_path, "wb") as fh:
+        fh.write(data)
+    return data
+
+
 def send_bmp_to_printer(bmp_path: str) -> None:
     """Send a BMP file to the printer via IPP."""
     uri = f"ipp://{config.PRINTER_IP}:{config.PRINTER_PORT}/ipp/print"
@@ -0,0 +1,220 @@
+"""Opt-in per-request profiling with cProfile and tracemalloc.
+
+When enabled, a sampled fraction of requests (or those sending
+``X-Profile: 1``, if allowed) run under cProfile and tracemalloc.  Each
+profile is written to ``<TEMP_IMAGE_DIR>/profiles/<job_id>.prof`` together
+with a JSON summary of the hottest functions and allocation sites, and the
+job id is returned in the ``X-Profile-Id`` response header.  If the view's
+JSON response carries a ``history_id``, it is recorded in the summary so a
+profile can be matched to the archived print job.
+
+Only one request is profiled at a time: cProfile and tracemalloc are
+process-wide, so a request that comes up for profiling while another is
+being profiled simply runs unprofiled rather than waiting.  tracemalloc also
+sees every thread, so the allocation diff and peak of a profile include
+whatever other (unprofiled) requests allocated concurrently; profile on a
+quiet server for clean numbers.
+
+With profiling disabled, :meth:`Profiler.profiled` returns the view
+unchanged, so there is no per-request cost at all.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import glob
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from typing import Any, Callable
+
+from flask import current_app, make_response, request
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class Profiler:
+    """Wraps Flask views and records profiles for sampled requests."""
+
+    def __init__(
+        self,
+        output_dir: str,
+        sample_rate: float = 0.0,
+        allow_header: bool = False,
+        top_n: int = 20,
+        max_kept: int = 50,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.allow_header = allow_header
+        self.top_n = top_n
+        self.max_kept = max_kept
+        self._rng = rng
+        # Held while a request is being profiled (see the module docstring).
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.allow_header
+
+    def profiled(self, view: Callable) -> Callable:
+        """Decorator: profile *view* for sampled requests."""
+        if not self.enabled:
+            return view
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self._should_profile():
+                return view(*args, **kwargs)
+            return self._run(view, args, kwargs)
+
+        return wrapper
+
+    def _should_profile(self) -> bool:
+        if self.allow_header and request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true"):
+            return True
+        return self.sample_rate > 0 and self._rng() < self.sample_rate
+
+    def _run(self, view: Callable, args: tuple, kwargs: dict):
+        if not self._lock.acquire(blocking=False):
+            return view(*args, **kwargs)
+        job_id = uuid.uuid4().hex
+        response = None
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            profile = cProfile.Profile()
+            t0 = time.perf_counter()
+            profile.enable()
+            try:
+                response = make_response(view(*args, **kwargs))
+            finally:
+                profile.disable()
+                wall_ms = (time.perf_counter() - t0) * 1000
+                after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                if started_tracing:
+                    tracemalloc.stop()
+                # Profiling must never fail a request (the note may already
+                # have printed), so storage errors are only logged.
+                try:
+                    self._save(job_id, profile, before, after, wall_ms, peak, _history_id(response))
+                except Exception as exc:
+                    current_app.logger.warning("Saving profile %s failed: %s", job_id, exc)
+                    job_id = None
+        finally:
+            self._lock.release()
+
+        if job_id is not None:
+            response.headers[PROFILE_ID_HEADER] = job_id
+        return response
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    @property
+    def profile_dir(self) -> str:
+        return os.path.join(self.output_dir, "profiles")
+
+    def _save(
+        self,
+        job_id: str,
+        profile: cProfile.Profile,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        wall_ms: float,
+        peak_bytes: int,
+        history_id: str | None = None,
+    ) -> None:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profile.dump_stats(os.path.join(self.profile_dir, f"{job_id}.prof"))
+
+        stats = pstats.Stats(profile)
+        hot = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)
+        top_functions = [
+            {
+                "function": f"{os.path.basename(filename)}:{lineno}({func})",
+                "calls": nc,
+                "self_ms": round(tt * 1000, 3),
+                "cumulative_ms": round(ct * 1000, 3),
+            }
+            for (filename, lineno, func), (_, nc, tt, ct, _) in hot[: self.top_n]
+        ]
+
+        diff = after.compare_to(before, "lineno")
+        top_allocations = [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count_diff,
+            }
+            for stat in diff[: self.top_n]
+        ]
+
+        summary = {
+            "job_id": job_id,
+            "history_id": history_id,
+            "endpoint": request.path,
+            "created": time.time(),
+            "wall_ms": round(wall_ms, 3),
+            "peak_kb": round(peak_bytes / 1024, 1),
+            "top_functions": top_functions,
+            "top_allocations": top_allocations,
+        }
+        with open(os.path.join(self.profile_dir, f"{job_id}.json"), "w") as fh:
+            json.dump(summary, fh)
+        self._prune()
+
+    def _prune(self) -> None:
+        summaries = sorted(glob.glob(os.path.join(self.profile_dir, "*.json")), key=os.path.getmtime)
+        for path in summaries[: max(0, len(summaries) - self.max_kept)]:
+            stem = os.path.splitext(path)[0]
+            for ext in (".json", ".prof"):
+                try:
+                    os.remove(stem + ext)
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self) -> list[dict[str, Any]]:
+        """Brief listing of stored profiles, newest first."""
+        out = []
+        for path in glob.glob(os.path.join(self.profile_dir, "*.json")):
+            with open(path) as fh:
+                summary = json.load(fh)
+            fields = ("job_id", "history_id", "endpoint", "created", "wall_ms", "peak_kb")
+            out.append({k: summary.get(k) for k in fields})
+        out.sort(key=lambda s: s["created"], reverse=True)
+        return out
+
+    def load_profile(self, job_id: str) -> dict[str, Any] | None:
+        """Return the stored summary for *job_id*, or ``None``."""
+        if not _JOB_ID_RE.match(job_id):
+            return None
+        path = os.path.join(self.profile_dir, f"{job_id}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as fh:
+            return json.load(fh)
+
+
+def _history_id(response) -> str | None:
+    """The ``history_id`` from a JSON view response, if there is one."""
+    if response is None or not response.is_json:
+        return None
+    body = response.get_json(silent=True)
+    return body.get("history_id") if isinstance(body, dict) else None
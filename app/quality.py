@@ -0,0 +1,57 @@
+"""Named print-quality/speed profiles.
+
+A profile decides how a note goes from payload to printer bytes:
+
+- ``render_scale`` — render at this fraction/multiple of print resolution;
+  the result is resampled to the printer width afterwards.
+- ``font_scale`` — shrink or grow the text (and so the note's length).
+- ``line_gap_px`` — default line gap (a payload's own ``line_gap_px`` wins).
+- ``dither`` — Floyd–Steinberg when reducing to 1 bit (the original
+  pipeline); off means nearest-neighbour upscaling and hard thresholds.
+- ``encoder`` — ``"native"`` (in-process) or ``"imagemagick"``.
+
+Profiles are defined in ``Config.QUALITY_PROFILES`` and chosen per request
+with ``options.quality``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, NamedTuple
+
+ENCODERS = ("native", "imagemagick")
+
+
+class QualityProfile(NamedTuple):
+    name: str
+    render_scale: float = 1.0
+    font_scale: float = 1.0
+    line_gap_px: int | None = None
+    dither: bool = True
+    encoder: str = "native"
+
+
+def load_profiles(spec: dict[str, dict[str, Any]], default: str | None = None) -> dict[str, QualityProfile]:
+    """Build profiles from ``Config.QUALITY_PROFILES``-style dicts.
+
+    Raises ``ValueError`` for a bad profile, or if *default* (the configured
+    default profile name) is not one of them.
+    """
+    profiles = {}
+    for name, fields in spec.items():
+        profile = QualityProfile(name=name, **fields)
+        if profile.encoder not in ENCODERS:
+            raise ValueError(f"Unknown encoder {profile.encoder!r} in quality profile {name!r}")
+        if profile.render_scale <= 0 or profile.font_scale <= 0:
+            raise ValueError(f"Scales in quality profile {name!r} must be positive")
+        profiles[name] = profile
+    if default is not None and default not in profiles:
+        raise ValueError(f"Default quality profile {default!r} is not one of {sorted(profiles)}")
+    return profiles
+
+
+def apply_profile(payload: dict, profile: QualityProfile) -> dict:
+    """Return *payload* with the profile's option defaults filled in."""
+    opts = payload.get("options", {})
+    if profile.line_gap_px is None or "line_gap_px" in opts:
+        return payload
+    return {**payload, "options": {**opts, "line_gap_px": profile.line_gap_px}}
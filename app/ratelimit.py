@@ -0,0 +1,188 @@
+"""Per-client rate limiting and fair access to the printer.
+
+Two pieces keep one chatty client from starving everyone else:
+
+- :class:`RateLimiter` holds a token bucket per client and rejects requests
+  once a client's bucket is empty, reporting how long to wait.
+- :class:`FairPrintQueue` caps the jobs in flight to the printer and,
+  when several jobs are waiting, admits them in weighted-fair order instead
+  of first-come-first-served.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+def parse_weights(spec: str) -> dict[str, float]:
+    """Parse ``"key:kiosk=4,ip:10.0.0.7=0.5"`` into ``{"key:kiosk": 4.0, ...}``.
+
+    Raises ``ValueError`` naming the offending entry if it is malformed.
+    """
+    weights: dict[str, float] = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.rpartition("=")
+        name = name.strip()
+        if not sep or not name:
+            raise ValueError(f"CLIENT_WEIGHTS entry {part!r} must look like 'client=weight'")
+        try:
+            weight = float(value)
+        except ValueError:
+            raise ValueError(f"CLIENT_WEIGHTS entry {part!r} has a non-numeric weight") from None
+        if weight <= 0:
+            raise ValueError(f"CLIENT_WEIGHTS entry {part!r} must have a positive weight")
+        weights[name] = weight
+    return weights
+
+
+class TokenBucket:
+    """Classic token bucket: *rate* tokens per second, up to *capacity*."""
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def try_take(self, now: float, cost: float = 1.0) -> float:
+        """Take *cost* tokens if available.
+
+        Returns ``0.0`` on success, otherwise the number of seconds until
+        enough tokens will have accumulated.
+        """
+        self._refill(now)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token-bucket rate limiter keyed by client id.
+
+    Buckets are kept in an LRU map capped at *max_clients* so an attacker
+    cycling through client ids cannot grow memory without bound.  A
+    *per_minute* of zero or less disables limiting.
+    """
+
+    def __init__(
+        self,
+        per_minute: float,
+        burst: int,
+        max_clients: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self.enabled = per_minute > 0
+        self._clock = clock
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client_id: str) -> float:
+        """Consume one request for *client_id*.
+
+        Returns ``0.0`` if the request is allowed, otherwise the suggested
+        ``Retry-After`` delay in seconds.
+        """
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            bucket = self._buckets.pop(client_id, None)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst, now)
+            self._buckets[client_id] = bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return bucket.try_take(now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class FairPrintQueue:
+    """Share printer access among clients using weighted fair queuing.
+
+    At most *capacity* jobs hold a slot at once (the printer's in-flight
+    limit); the rest wait.  Each job gets a virtual finish tag ``max(V, last_finish[client]) +
+    1 / weight``; the waiting job with the smallest tag prints next.  A
+    client with weight 2 therefore gets roughly twice as many turns as one
+    with weight 1 while both have work queued, and a client with a long
+    backlog cannot push ahead of a newcomer.
+    """
+
+    def __init__(
+        self,
+        weights: dict[str, float] | None = None,
+        default_weight: float = 1.0,
+        capacity: int = 1,
+    ) -> None:
+        self.weights = dict(weights or {})
+        self.default_weight = default_weight
+        self.capacity = max(1, capacity)
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._last_finish: dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._active = 0
+
+    def weight_for(self, client_id: str) -> float:
+        return self.weights.get(client_id, self.default_weight)
+
+    @contextmanager
+    def slot(self, client_id: str, timeout: float | None = None) -> Iterator[None]:
+        """Block until *client_id* may use the printer, then hold a slot.
+
+        Raises ``TimeoutError`` if no slot comes up within *timeout* seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            weight = max(self.weight_for(client_id), 1e-6)
+            start = max(self._virtual_time, self._last_finish.get(client_id, 0.0))
+            finish = start + 1.0 / weight
+            self._last_finish[client_id] = finish
+            entry = (finish, next(self._seq), client_id)
+            heapq.heappush(self._waiting, entry)
+            while self._active >= self.capacity or self._waiting[0] is not entry:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    # The next job in line may now be at the head.
+                    self._cond.notify_all()
+                    raise TimeoutError(f"no printer slot free after {timeout:g}s")
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiting)
+            self._active += 1
+            self._virtual_time = finish
+            # With spare capacity, the next job in line may go too.
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                if not self._waiting and not self._active:
+                    # Idle: forget history so returning clients start fresh.
+                    self._last_finish.clear()
+                self._cond.notify_all()
@@ -0,0 +1,77 @@
+"""Cache of pre-rasterised, fixed-width note elements.
+
+Titles, area header bars and footer lines repeat across notes (the same
+store sections, the same footer, the same timestamp within a minute), so
+they are rasterised once and pasted as ready 1-bit bitmaps.  Entries are
+keyed by text, width and font chain; chains are themselves cached per size
+in :mod:`app.rendering.fonts`, so identity is a stable key.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import NamedTuple
+
+from PIL import Image, ImageDraw
+
+from app.rendering.fonts import FontChain
+from app.rendering.text_layout import draw_text, wrap_text
+
+_CACHE_SIZE = 256
+
+# Slack around text masks so glyph overhang (negative bearings, tall
+# fallback glyphs) isn't clipped.
+_PAD = 4
+
+
+class TextBlock(NamedTuple):
+    """Wrapped text rasterised as an ink mask (255 = ink).
+
+    Paste with ``img.paste(0, (x - TextBlock.pad, y - TextBlock.pad), mask)``
+    to draw the text with its first line's top-left at ``(x, y)``.
+    """
+
+    mask: Image.Image
+    line_count: int
+    pad: int = _PAD
+
+
+def line_height(font: FontChain) -> int:
+    bbox = font.getbbox("Ay")
+    return bbox[3] - bbox[1]
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def text_block(text: str, width: int, font: FontChain, line_gap: int) -> TextBlock:
+    """Rasterise *text* wrapped to *width*, one line every ``line_height + line_gap`` px."""
+    scratch = ImageDraw.Draw(Image.new("1", (1, 1), 1))
+    lines = wrap_text(text, font, scratch, width)
+    step = line_height(font) + line_gap
+    extent = max(sum(f.getmetrics()) for f in font.fonts if hasattr(f, "getmetrics"))
+
+    mask = Image.new("1", (width + 2 * _PAD, (len(lines) - 1) * step + extent + 2 * _PAD), 0)
+    draw = ImageDraw.Draw(mask)
+    y = _PAD
+    for line in lines:
+        draw_text(draw, (_PAD, y), line, font, 1)
+        y += step
+    return TextBlock(mask, len(lines))
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def header_bar(
+    text: str,
+    width: int,
+    height: int,
+    font: FontChain,
+    inset: tuple[int, int] = (4, 2),
+) -> Image.Image:
+    """Rasterise an inverted (white-on-black) area header bar."""
+    bar = Image.new("1", (width, height), 0)
+    draw_text(ImageDraw.Draw(bar), inset, text, font, 1)
+    return bar
+
+
+def clear() -> None:
+    text_block.cache_clear()
+    header_bar.cache_clear()
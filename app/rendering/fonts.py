@@ -0,0 +1,226 @@
+"""Font fallback chains backed by a per-font codepoint coverage index.
+
+A :class:`FontChain` is an ordered list of faces at one size.  Text is split
+into runs, each drawn with the first face whose ``cmap`` actually maps the
+character to a glyph, so symbols, CJK and emoji fall through to a face that
+can render them instead of printing tofu boxes.
+
+Coverage is read once per font file straight from its ``cmap`` table and
+cached; lookups are plain set membership.
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import Iterable
+
+from PIL import ImageFont
+
+# Faces tried after the primary DejaVu face and before Pillow's built-in
+# default, as installed by the Docker image (fonts-noto-cjk, fonts-noto-core
+# and fonts-symbola; Symbola is a monochrome face covering emoji).  Missing
+# files are skipped.  Override with ``set_fallback_fonts``.
+DEFAULT_FALLBACK_FONTS: tuple[str, ...] = (
+    "NotoSansCJK-Regular.ttc",
+    "NotoSansSymbols2-Regular.ttf",
+    "Symbola_hint.ttf",
+)
+
+_fallback_fonts: tuple[str, ...] = DEFAULT_FALLBACK_FONTS
+
+_COVERAGE_CACHE: dict[tuple[str, int], frozenset[int] | None] = {}
+_CHAIN_CACHE: dict[tuple[int, bool], "FontChain"] = {}
+
+
+# ---------------------------------------------------------------------------
+# cmap parsing
+# ---------------------------------------------------------------------------
+
+def read_cmap(data: bytes, index: int = 0) -> frozenset[int]:
+    """Return the set of codepoints mapped to a real glyph in a TrueType/OpenType font.
+
+    Supports single fonts and collections (``.ttc``), and the Unicode cmap
+    subtable formats 4 and 12.  Raises ``ValueError`` for anything else.
+    """
+    base = 0
+    if data[:4] == b"ttcf":
+        num_fonts = struct.unpack_from(">I", data, 8)[0]
+        if index >= num_fonts:
+            raise ValueError(f"font index {index} out of range ({num_fonts} fonts)")
+        base = struct.unpack_from(">I", data, 12 + 4 * index)[0]
+
+    num_tables = struct.unpack_from(">H", data, base + 4)[0]
+    cmap_offset = None
+    for i in range(num_tables):
+        tag, _, offset, _ = struct.unpack_from(">4sIII", data, base + 12 + 16 * i)
+        if tag == b"cmap":
+            cmap_offset = offset
+            break
+    if cmap_offset is None:
+        raise ValueError("font has no cmap table")
+
+    num_subtables = struct.unpack_from(">H", data, cmap_offset + 2)[0]
+    covered: set[int] = set()
+    parsed = False
+    for i in range(num_subtables):
+        platform, encoding, offset = struct.unpack_from(">HHI", data, cmap_offset + 4 + 8 * i)
+        if not (platform == 0 or (platform == 3 and encoding in (1, 10))):
+            continue
+        sub = cmap_offset + offset
+        fmt = struct.unpack_from(">H", data, sub)[0]
+        if fmt == 4:
+            covered.update(_cmap_format4(data, sub))
+            parsed = True
+        elif fmt == 12:
+            covered.update(_cmap_format12(data, sub))
+            parsed = True
+    if not parsed:
+        raise ValueError("font has no supported Unicode cmap subtable")
+    return frozenset(covered)
+
+
+def _cmap_format4(data: bytes, sub: int) -> Iterable[int]:
+    seg_count = struct.unpack_from(">H", data, sub + 6)[0] // 2
+    ends_at = sub + 14
+    starts_at = ends_at + 2 * seg_count + 2  # skip reservedPad
+    deltas_at = starts_at + 2 * seg_count
+    range_offsets_at = deltas_at + 2 * seg_count
+
+    ends = struct.unpack_from(f">{seg_count}H", data, ends_at)
+    starts = struct.unpack_from(f">{seg_count}H", data, starts_at)
+    deltas = struct.unpack_from(f">{seg_count}h", data, deltas_at)
+    range_offsets = struct.unpack_from(f">{seg_count}H", data, range_offsets_at)
+
+    for i in range(seg_count):
+        start, end, delta, range_offset = starts[i], ends[i], deltas[i], range_offsets[i]
+        if start == 0xFFFF:
+            continue
+        for cp in range(start, end + 1):
+            if range_offset == 0:
+                glyph = (cp + delta) & 0xFFFF
+            else:
+                addr = range_offsets_at + 2 * i + range_offset + 2 * (cp - start)
+                glyph = struct.unpack_from(">H", data, addr)[0]
+                if glyph:
+                    glyph = (glyph + delta) & 0xFFFF
+            if glyph:
+                yield cp
+
+
+def _cmap_format12(data: bytes, sub: int) -> Iterable[int]:
+    num_groups = struct.unpack_from(">I", data, sub + 12)[0]
+    for g in range(num_groups):
+        start, end, start_glyph = struct.unpack_from(">III", data, sub + 16 + 12 * g)
+        first = start + 1 if start_glyph == 0 else start
+        yield from range(first, end + 1)
+
+
+def _font_coverage(font: ImageFont.FreeTypeFont) -> frozenset[int] | None:
+    """Return (cached) coverage for *font*, or ``None`` if it can't be read."""
+    path = getattr(font, "path", None)
+    data = getattr(font, "font_bytes", None)
+    index = getattr(font, "index", 0)
+    if isinstance(path, str):
+        key = (path, index)
+    elif data is not None:
+        key = (f"<bytes:{len(data)}:{hash(bytes(data))}>", index)
+    else:
+        return None  # bitmap font: no cmap to read
+    if key not in _COVERAGE_CACHE:
+        try:
+            if isinstance(path, str):
+                with open(path, "rb") as fh:
+                    data = fh.read()
+            _COVERAGE_CACHE[key] = read_cmap(data, index)
+        except Exception:
+            _COVERAGE_CACHE[key] = None
+    return _COVERAGE_CACHE[key]
+
+
+# ---------------------------------------------------------------------------
+# Font chains
+# ---------------------------------------------------------------------------
+
+class FontChain:
+    """An ordered list of fonts at one size, picked per character by coverage."""
+
+    def __init__(self, fonts: list[ImageFont.FreeTypeFont]) -> None:
+        if not fonts:
+            raise ValueError("FontChain needs at least one font")
+        self.fonts = fonts
+        self.primary = fonts[0]
+        self._coverage = [_font_coverage(f) for f in fonts]
+        self._font_for: dict[str, ImageFont.FreeTypeFont | None] = {}
+
+    def font_for(self, ch: str) -> ImageFont.FreeTypeFont | None:
+        """Return the first font that has a glyph for *ch*, or ``None``."""
+        try:
+            return self._font_for[ch]
+        except KeyError:
+            pass
+        cp = ord(ch)
+        found = None
+        for font, coverage in zip(self.fonts, self._coverage):
+            # A font whose cmap couldn't be read is assumed to cover everything.
+            if coverage is None or cp in coverage:
+                found = font
+                break
+        self._font_for[ch] = found
+        return found
+
+    def covers(self, text: str) -> bool:
+        """True if every character in *text* has a glyph somewhere in the chain."""
+        return all(self.font_for(ch) is not None for ch in text)
+
+    def runs(self, text: str) -> list[tuple[str, ImageFont.FreeTypeFont]]:
+        """Split *text* into ``(run, font)`` pieces.
+
+        Whitespace stays with the current run so word spacing isn't broken
+        up.  Characters no font covers are drawn with the primary face.
+        """
+        out: list[tuple[str, ImageFont.FreeTypeFont]] = []
+        buf = ""
+        current = None
+        for ch in text:
+            if ch.isspace() and current is not None:
+                buf += ch
+                continue
+            font = self.font_for(ch) or self.primary
+            if font is current:
+                buf += ch
+                continue
+            if buf:
+                out.append((buf, current or self.primary))
+            buf, current = ch, font
+        if buf:
+            out.append((buf, current or self.primary))
+        return out
+
+    def getbbox(self, text: str) -> tuple[int, int, int, int]:
+        """Bounding box of *text* in the primary face (used for line heights)."""
+        return self.primary.getbbox(text)
+
+
+def set_fallback_fonts(names: Iterable[str]) -> None:
+    """Replace the fallback font list and drop cached chains."""
+    global _fallback_fonts
+    _fallback_fonts = tuple(n for n in names if n)
+    _CHAIN_CACHE.clear()
+
+
+def load_chain(size: int, bold: bool = False) -> FontChain:
+    """Return the (cached) fallback chain for DejaVuSans at *size*."""
+    key = (size, bold)
+    if key not in _CHAIN_CACHE:
+        primary = "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"
+        names = [primary, *_fallback_fonts]
+
+        fonts: list[ImageFont.FreeTypeFont] = []
+        for name in names:
+            try:
+                fonts.append(ImageFont.truetype(name, size))
+            except Exception:
+                continue
+        fonts.append(ImageFont.load_default(size))
+        _CHAIN_CACHE[key] = FontChain(fonts)
+    return _CHAIN_CACHE[key]
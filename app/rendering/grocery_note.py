@@ -4,30 +4,19 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 
-from app.rendering.text_layout import measure, wrap_text
+from app.rendering.assets import TextBlock, header_bar, line_height, text_block
+from app.rendering.fonts import FontChain, load_chain
+from app.rendering.text_layout import draw_text, measure, wrap_text
 
 # ---------------------------------------------------------------------------
 # Font helpers
 # ---------------------------------------------------------------------------
 
-_FONT_CACHE: dict[tuple[str, int], ImageFont.ImageFont] = {}
-
-
-def _load_font(size: int, bold: bool = False) -> ImageFont.ImageFont:
-    """Try to load DejaVuSans; fall back to Pillow default."""
-    name = "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"
-    key = (name, size)
-    if key not in _FONT_CACHE:
-        try:
-            _FONT_CACHE[key] = ImageFont.truetype(name, size)
-        except Exception:
-            try:
-                _FONT_CACHE[key] = ImageFont.truetype("DejaVuSans-Bold.ttf", size)
-            except Exception:
-                _FONT_CACHE[key] = ImageFont.load_default(size)
-    return _FONT_CACHE[key]
+def _load_font(size: int, bold: bool = False) -> FontChain:
+    """Return the DejaVuSans fallback chain at *size* (see ``app.rendering.fonts``)."""
+    return load_chain(size, bold)
 
 
 # ---------------------------------------------------------------------------
@@ -40,17 +29,16 @@ def _draw_checkbox(
     y: int,
     size: int,
     checked: bool,
-    font: ImageFont.ImageFont,
+    font: FontChain,
 ) -> int:
     """Draw a checkbox glyph and return its width (including trailing space)."""
-    # Try Unicode glyphs first.
+    # Use the Unicode glyph if some font in the chain really maps it;
+    # otherwise fall back to manual drawing (avoids printing a tofu box).
     glyph = "☑" if checked else "☐"
-    glyph_w = measure(glyph, font, draw)
-    # If the font actually renders the glyph (nonzero width and not a tofu box),
-    # use it; otherwise fall back to manual drawing.
-    if glyph_w > 0:
-        draw.text((x, y), glyph, font=font, fill=0)
-        return int(glyph_w) + 4
+    glyph_font = font.font_for(glyph)
+    if glyph_font is not None:
+        draw.text((x, y), glyph, font=glyph_font, fill=0)
+        return int(measure(glyph, glyph_font, draw)) + 4
 
     # Manual box
     box_size = size - 4
@@ -67,34 +55,47 @@ def _draw_checkbox(
 # Public rendering function
 # ---------------------------------------------------------------------------
 
-def render_grocery_note(payload: dict) -> Image.Image:
+def render_grocery_note(payload: dict, scale: float = 1.0, font_scale: float = 1.0) -> Image.Image:
     """Render *payload* to a 1-bit monochrome ``Image``.
 
+    *scale* multiplies every pixel dimension (width, margins, fonts), so a
+    note can be rendered below or above print resolution and resampled
+    afterwards.  *font_scale* additionally shrinks or grows the text and
+    the columns sized to it.
+
     See module / project docs for the expected payload schema.
     """
+
+    def px(v: float) -> int:
+        return round(v * scale)
+
+    def fpx(v: float) -> int:
+        return max(1, round(v * scale * font_scale))
+
     title: str = payload.get("title", "Grocery List")
     areas: list[dict] = payload.get("areas", [])
     opts: dict = payload.get("options", {})
 
-    width_px: int = opts.get("width_px", 576)
-    margin: int = opts.get("margin_px", 16)
-    line_gap: int = opts.get("line_gap_px", 6)
+    width_px: int = px(opts.get("width_px", 576))
+    margin: int = px(opts.get("margin_px", 16))
+    line_gap: int = px(opts.get("line_gap_px", 6))
     include_checked: bool = opts.get("include_checked", False)
     footer: str = payload.get("footer", "")
 
     usable_w = width_px - 2 * margin
 
     # Fonts
-    title_font = _load_font(28, bold=True)
-    header_font = _load_font(22, bold=True)
-    item_font = _load_font(20)
-    footer_font = _load_font(14)
+    title_font = _load_font(fpx(28), bold=True)
+    header_font = _load_font(fpx(22), bold=True)
+    item_font = _load_font(fpx(20))
+    footer_font = _load_font(fpx(14))
 
     # Column layout
-    left_col_w = 110  # qty+unit column
-    checkbox_size = 20
-    right_col_x_offset = left_col_w + checkbox_size + 8
-    right_col_w = usable_w - right_col_x_offset - 2  # 2px glyph-overhang guard
+    left_col_w = fpx(110)  # qty+unit column
+    checkbox_size = fpx(20)
+    right_col_x_offset = left_col_w + checkbox_size + px(8)
+    right_col_w = usable_w - right_col_x_offset - px(2)  # 2px glyph-overhang guard
+    header_pad = px(4)
 
     # --- First pass: compute height ---
     # We draw onto a scratch image just for measurement.
@@ -103,7 +104,8 @@ def render_grocery_note(payload: dict) -> Image.Image:
 
     y = margin
     # Title
-    y += _text_block_height(title, title_font, sd, usable_w, line_gap)
+    title_block = text_block(title, usable_w, title_font, line_gap)
+    y += title_block.line_count * (line_height(title_font) + line_gap) - line_gap
     y += line_gap * 2  # extra space after title
 
     for area in areas:
@@ -114,23 +116,23 @@ def render_grocery_note(payload: dict) -> Image.Image:
             continue
 
         # Area header
-        y += _line_height(header_font) + 4  # header + underline
+        y += line_height(header_font) + header_pad  # header + underline
         y += line_gap
 
         for item in items:
             item_text = _item_label(item)
             wrapped = wrap_text(item_text, item_font, sd, right_col_w)
-            row_h = max(_line_height(item_font), len(wrapped) * (_line_height(item_font) + line_gap) - line_gap)
+            row_h = max(line_height(item_font), len(wrapped) * (line_height(item_font) + line_gap) - line_gap)
             y += row_h + line_gap
 
         y += line_gap  # section gap
 
     # Footer area: separator + optional footer text + timestamp
     y += line_gap * 2 + line_gap  # space before separator + separator gap
-    footer_lh = _line_height(footer_font)
+    footer_lh = line_height(footer_font)
     if footer:
-        footer_lines = wrap_text(footer, footer_font, sd, usable_w)
-        y += len(footer_lines) * (footer_lh + line_gap)
+        footer_block = text_block(footer, usable_w, footer_font, line_gap)
+        y += footer_block.line_count * (footer_lh + line_gap)
     timestamp_str = datetime.now().strftime("Printed %Y-%m-%d %H:%M")
     y += footer_lh
 
@@ -142,10 +144,9 @@ def render_grocery_note(payload: dict) -> Image.Image:
 
     y = margin
 
-    # Title
-    for line in wrap_text(title, title_font, draw, usable_w):
-        draw.text((margin, y), line, font=title_font, fill=0)
-        y += _line_height(title_font) + line_gap
+    # Title (cached bitmap)
+    _paste_text(img, title_block, margin, y)
+    y += title_block.line_count * (line_height(title_font) + line_gap)
     y += line_gap  # extra space
 
     for area in areas:
@@ -155,13 +156,10 @@ def render_grocery_note(payload: dict) -> Image.Image:
         if not items:
             continue
 
-        # Area header (inverted bar)
-        header_h = _line_height(header_font) + 4
-        draw.rectangle(
-            [margin, y, margin + usable_w - 1, y + header_h],
-            fill=0,
-        )
-        draw.text((margin + 4, y + 2), area.get("name", ""), font=header_font, fill=1)
+        # Area header (inverted bar, cached bitmap)
+        header_h = line_height(header_font) + header_pad
+        bar = header_bar(area.get("name", ""), usable_w, header_h + 1, header_font, (header_pad, px(2)))
+        img.paste(bar, (margin, y))
         y += header_h + line_gap
 
         for item in items:
@@ -171,10 +169,10 @@ def render_grocery_note(payload: dict) -> Image.Image:
             # Right-align qty+unit in left column
             qty_w = measure(qty_unit, item_font, draw)
             qty_x = margin + left_col_w - qty_w
-            draw.text((qty_x, y), qty_unit, font=item_font, fill=0)
+            draw_text(draw, (qty_x, y), qty_unit, item_font, 0)
 
             # Checkbox
-            cb_x = margin + left_col_w + 2
+            cb_x = margin + left_col_w + px(2)
             cb_w = _draw_checkbox(draw, cb_x, y, checkbox_size, checked, item_font)
 
             # Item text (wrapped)
@@ -183,12 +181,12 @@ def render_grocery_note(payload: dict) -> Image.Image:
             wrapped = wrap_text(item_text, item_font, draw, right_col_w)
             line_y = y
             for wl in wrapped:
-                draw.text((text_x, line_y), wl, font=item_font, fill=0)
-                line_y += _line_height(item_font) + line_gap
+                draw_text(draw, (text_x, line_y), wl, item_font, 0)
+                line_y += line_height(item_font) + line_gap
 
             row_h = max(
-                _line_height(item_font),
-                len(wrapped) * (_line_height(item_font) + line_gap) - line_gap,
+                line_height(item_font),
+                len(wrapped) * (line_height(item_font) + line_gap) - line_gap,
             )
             y += row_h + line_gap
 
@@ -196,14 +194,12 @@ def render_grocery_note(payload: dict) -> Image.Image:
 
     # Footer: thin separator + optional footer text + timestamp
     y += line_gap * 2
-    draw.line([(margin, y), (margin + usable_w - 1, y)], fill=0, width=1)
+    draw.line([(margin, y), (margin + usable_w - 1, y)], fill=0, width=max(1, px(1)))
     y += line_gap
-    footer_lh = _line_height(footer_font)
     if footer:
-        for fl in wrap_text(footer, footer_font, draw, usable_w):
-            draw.text((margin, y), fl, font=footer_font, fill=0)
-            y += footer_lh + line_gap
-    draw.text((margin, y), timestamp_str, font=footer_font, fill=0)
+        _paste_text(img, footer_block, margin, y)
+        y += footer_block.line_count * (footer_lh + line_gap)
+    _paste_text(img, text_block(timestamp_str, usable_w, footer_font, line_gap), margin, y)
     y += footer_lh
 
     # Crop to actual content height
@@ -215,21 +211,9 @@ def render_grocery_note(payload: dict) -> Image.Image:
 # Internal helpers
 # ---------------------------------------------------------------------------
 
-def _line_height(font: ImageFont.ImageFont) -> int:
-    bbox = font.getbbox("Ay")
-    return bbox[3] - bbox[1]
-
-
-def _text_block_height(
-    text: str,
-    font: ImageFont.ImageFont,
-    draw: ImageDraw.ImageDraw,
-    max_w: float,
-    gap: int,
-) -> int:
-    lines = wrap_text(text, font, draw, max_w)
-    lh = _line_height(font)
-    return len(lines) * lh + (len(lines) - 1) * gap
+def _paste_text(img: Image.Image, block: TextBlock, x: int, y: int) -> None:
+    """Draw a cached text block in black with its first line at ``(x, y)``."""
+    img.paste(0, (x - block.pad, y - block.pad), block.mask)
 
 
 def _item_label(item: dict) -> str:
@@ -2,12 +2,37 @@
 
 from PIL import ImageDraw, ImageFont
 
+from app.rendering.fonts import FontChain
 
-def measure(text: str, font: ImageFont.ImageFont, draw: ImageDraw.ImageDraw) -> float:
-    """Return the pixel width of *text* rendered with *font*."""
+
+def measure(text: str, font: ImageFont.ImageFont | FontChain, draw: ImageDraw.ImageDraw) -> float:
+    """Return the pixel width of *text* rendered with *font*.
+
+    *font* may be a :class:`FontChain`, in which case each run is measured
+    with the face that will draw it.
+    """
+    if isinstance(font, FontChain):
+        return sum(draw.textlength(run, font=f) for run, f in font.runs(text))
     return draw.textlength(text, font=font)
 
 
+def draw_text(
+    draw: ImageDraw.ImageDraw,
+    xy: tuple[float, float],
+    text: str,
+    font: ImageFont.ImageFont | FontChain,
+    fill: int,
+) -> None:
+    """Draw *text* at *xy*, switching faces per run when *font* is a chain."""
+    if not isinstance(font, FontChain):
+        draw.text(xy, text, font=font, fill=fill)
+        return
+    x, y = xy
+    for run, f in font.runs(text):
+        draw.text((x, y), run, font=f, fill=fill)
+        x += draw.textlength(run, font=f)
+
+
 def wrap_text(
     text: str,
     font: ImageFont.ImageFont,
@@ -84,11 +109,15 @@ def ellipsize(
 
     # Pick ellipsis glyph – fall back to "..." if font can't render "…".
     ellipsis_char = "…"
-    try:
-        if measure(ellipsis_char, font, draw) == 0:
+    if isinstance(font, FontChain):
+        if not font.covers(ellipsis_char):
+            ellipsis_char = "..."
+    else:
+        try:
+            if measure(ellipsis_char, font, draw) == 0:
+                ellipsis_char = "..."
+        except Exception:
             ellipsis_char = "..."
-    except Exception:
-        ellipsis_char = "..."
 
     for end in range(len(text), 0, -1):
         candidate = text[:end] + ellipsis_char
@@ -1,20 +1,169 @@
 import base64
+import functools
 import io
+import math
 import os
 
-from flask import request, jsonify
+from flask import g, request, jsonify
 
 from app import app
 from app.config import config
+from app.history import PrintArchive
+from app.idempotency import CONFLICT, IN_PROGRESS, REPLAY, IdempotencyStore, payload_hash, request_key
 from app.image import make_image_from_list
 from app.printer import render_printable_bmp, print_image
+from app.profiling import Profiler
+from app.quality import apply_profile, load_profiles
+from app.ratelimit import FairPrintQueue, RateLimiter, parse_weights
+from app.rendering.fonts import set_fallback_fonts
 from app.rendering.grocery_note import render_grocery_note
-from app.printing.transport import send_png_to_printer
+from app.printing.async_transport import get_transport, send_job_sync
+from app.printing.transport import image_to_printer_bmp, png_to_printer_bmp, to_printer_raster
+
+
+_idempotency = IdempotencyStore(
+    ttl_seconds=config.IDEMPOTENCY_TTL_SECONDS,
+    max_entries=config.IDEMPOTENCY_MAX_ENTRIES,
+    wait_seconds=config.IDEMPOTENCY_WAIT_SECONDS,
+)
+# Requests without an Idempotency-Key, keyed by payload hash for a short window.
+_recent_payloads = IdempotencyStore(
+    ttl_seconds=config.IDEMPOTENCY_PAYLOAD_WINDOW_SECONDS,
+    max_entries=config.IDEMPOTENCY_MAX_ENTRIES,
+    wait_seconds=config.IDEMPOTENCY_WAIT_SECONDS,
+)
+
+_rate_limiter = RateLimiter(
+    per_minute=config.RATE_LIMIT_PER_MINUTE,
+    burst=config.RATE_LIMIT_BURST,
+)
+_print_queue = FairPrintQueue(
+    weights=parse_weights(config.CLIENT_WEIGHTS),
+    capacity=config.PRINTER_MAX_IN_FLIGHT,
+)
+_trusted_api_keys = frozenset(k.strip() for k in config.TRUSTED_API_KEYS.split(",") if k.strip())
+
+_printer = get_transport(
+    config.PRINTER_IP,
+    config.PRINTER_PORT,
+    timeout=config.PRINT_TIMEOUT_SECONDS,
+    max_in_flight=config.PRINTER_MAX_IN_FLIGHT,
+)
+
+if config.FONT_FALLBACK_CHAIN:
+    set_fallback_fonts(name.strip() for name in config.FONT_FALLBACK_CHAIN.split(","))
+
+_quality_profiles = load_profiles(config.QUALITY_PROFILES, default=config.DEFAULT_QUALITY_PROFILE)
+
+_archive = PrintArchive(config.HISTORY_DIR, max_bytes=config.HISTORY_MAX_BYTES)
+
+_profiler = Profiler(
+    output_dir=config.TEMP_IMAGE_DIR,
+    sample_rate=config.PROFILE_SAMPLE_RATE,
+    allow_header=config.PROFILE_HEADER_ENABLED,
+    top_n=config.PROFILE_TOP_N,
+)
+
+
+def _client_id():
+    """Identify the caller for rate limiting and fair queuing.
+
+    The API key is not authenticated, so it only identifies the caller when
+    it is one of ``TRUSTED_API_KEYS``; anyone else is keyed by remote address
+    and cannot dodge their limit by rotating keys.
+    """
+    api_key = request.headers.get("X-API-Key")
+    if api_key and api_key in _trusted_api_keys:
+        return f"key:{api_key}"
+    return f"ip:{request.remote_addr}"
+
+
+def _rate_limited(client_id):
+    """Return a 429 response if *client_id* is over its limit, else ``None``."""
+    retry_after = _rate_limiter.check(client_id)
+    if retry_after <= 0:
+        return None
+    resp = jsonify({"error": "Rate limit exceeded."})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return resp
+
+
+def _archive_job(payload, bmp_data):
+    """Record a printed job in the history archive; return its id (or ``None``)."""
+    try:
+        list_id = payload.get("list_id") if isinstance(payload, dict) else None
+        return _archive.append(payload, bmp_data, list_id=list_id)["id"]
+    except Exception as exc:
+        app.logger.warning("Archiving print job failed: %s", exc)
+        return None
+
+
+def _encode_bmp(raster, profile, png_path, bmp_path):
+    """Write the printer BMP for *raster* with the profile's encoder; return its bytes."""
+    if profile.encoder == "imagemagick":
+        png_to_printer_bmp(png_path, bmp_path)
+        with open(bmp_path, "rb") as fh:
+            return fh.read()
+    return image_to_printer_bmp(raster, bmp_path, dither=profile.dither)
+
+
+def _deduplicated(endpoint, by_payload=True):
+    """Decorator: deduplicate retried requests to a print endpoint.
+
+    Keys are scoped to the caller (see ``_client_id``). The first request for
+    a key runs the view; duplicates arriving meanwhile
+    wait for it. If the view called ``_remember`` (i.e. the job printed), its
+    response is replayed to later duplicates; otherwise the key is released
+    so the job can be retried. *by_payload* enables dedupe by payload hash
+    for requests without an ``Idempotency-Key`` header.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            header_key = request.headers.get("Idempotency-Key")
+            if header_key:
+                store = _idempotency
+            elif by_payload and _recent_payloads.enabled:
+                store = _recent_payloads
+            else:
+                return view(**kwargs)
+
+            fingerprint = payload_hash([request.get_json(silent=True), kwargs])
+            key = request_key(endpoint, _client_id(), fingerprint, header_key)
+            claim = store.claim(key, fingerprint)
+            if claim.status == REPLAY:
+                resp = jsonify(claim.response)
+                resp.headers["Idempotent-Replayed"] = "true"
+                return resp
+            if claim.status == CONFLICT:
+                return jsonify({"error": "Idempotency-Key was already used with a different request."}), 422
+            if claim.status == IN_PROGRESS:
+                return jsonify({"error": "A request with this Idempotency-Key is still in progress."}), 409
+
+            try:
+                response = view(**kwargs)
+                if "idempotent_response" in g:
+                    store.complete(key, g.idempotent_response)
+                return response
+            finally:
+                store.release(key)
+
+        return wrapper
+
+    return decorator
+
+
+def _remember(body):
+    """Mark the current request as done; *body* is replayed to its retries."""
+    g.idempotent_response = body
 
 
 # ---- Legacy endpoint (deprecated, kept for backwards compat) ----
 
 @app.route("/print/tasks", methods=["POST"])
+@_profiler.profiled
+@_deduplicated("tasks")
 def print_tasks():
     data = request.json
     tasks = data.get("tasks", [])
@@ -22,6 +171,11 @@ def print_tasks():
     if not tasks:
         return jsonify({"error": "No tasks provided."}), 400
 
+    client_id = _client_id()
+    limited = _rate_limited(client_id)
+    if limited is not None:
+        return limited
+
     os.makedirs(config.TEMP_IMAGE_DIR, exist_ok=True)
     temp_png = os.path.join(config.TEMP_IMAGE_DIR, "tasks.png")
     temp_bmp = os.path.join(config.TEMP_IMAGE_DIR, "printable_note.bmp")
@@ -31,22 +185,56 @@ def print_tasks():
     if not render_success:
         return jsonify({"error": "Failed to render BMP image."}), 500
 
-    success = print_image(temp_bmp)
-    return jsonify({"status": "printed" if success else "failed"})
+    # Read the raster now: another request may overwrite the shared temp file
+    # once this one leaves the print slot.
+    with open(temp_bmp, "rb") as fh:
+        bmp_data = fh.read()
+    try:
+        with _print_queue.slot(client_id, timeout=config.PRINT_TIMEOUT_SECONDS):
+            success = print_image(temp_bmp)
+    except TimeoutError as exc:
+        app.logger.warning("Printing failed: %s", exc)
+        success = False
+    body = {"status": "printed" if success else "failed"}
+    # Only successful prints are remembered so that a failed job can be retried.
+    if success:
+        body["history_id"] = _archive_job(data, bmp_data)
+        _remember(body)
+    return jsonify(body)
 
 
 # ---- New structured grocery endpoint ----
 
 @app.route("/print/grocery", methods=["POST"])
+@_profiler.profiled
+@_deduplicated("grocery")
 def print_grocery():
     payload = request.json
     if not payload or not payload.get("areas"):
         return jsonify({"error": "Payload must include 'areas'."}), 400
 
+    options = payload.get("options", {})
+    if not isinstance(options, dict):
+        return jsonify({"error": "'options' must be an object."}), 400
+    quality = options.get("quality", config.DEFAULT_QUALITY_PROFILE)
+    profile = _quality_profiles.get(quality) if isinstance(quality, str) else None
+    if profile is None:
+        return jsonify({"error": f"Unknown quality profile {quality!r}."}), 400
+
+    client_id = _client_id()
+    limited = _rate_limited(client_id)
+    if limited is not None:
+        return limited
+
     os.makedirs(config.TEMP_IMAGE_DIR, exist_ok=True)
 
-    # Render image
-    img = render_grocery_note(payload)
+    # Render image, then resample to the printer's 1-bit raster
+    img = render_grocery_note(
+        apply_profile(payload, profile),
+        scale=profile.render_scale,
+        font_scale=profile.font_scale,
+    )
+    img = to_printer_raster(img, dither=profile.dither)
 
     # Save PNG
     temp_png = os.path.join(config.TEMP_IMAGE_DIR, "grocery.png")
@@ -58,19 +246,90 @@ def print_grocery():
     preview_b64 = base64.b64encode(buf.getvalue()).decode()
 
     # Print
+    bmp_path = os.path.splitext(temp_png)[0] + ".bmp"
     sent = False
+    history_id = None
     try:
-        send_png_to_printer(temp_png)
+        bmp_data = _encode_bmp(img, profile, temp_png, bmp_path)
+        with _print_queue.slot(client_id, timeout=config.PRINT_TIMEOUT_SECONDS):
+            send_job_sync(_printer, bmp_data)
         sent = True
     except Exception as exc:
         app.logger.warning("Printing failed: %s", exc)
+    if sent:
+        history_id = _archive_job(payload, bmp_data)
 
-    bmp_path = os.path.splitext(temp_png)[0] + ".bmp"
-    return jsonify({
+    body = {
         "preview_png_base64": preview_b64,
         "sent_to_printer": sent,
+        "quality": profile.name,
+        "history_id": history_id,
         "saved_paths": {
             "png": temp_png,
             "bmp": bmp_path if os.path.exists(bmp_path) else None,
         },
-    })
+    }
+    if sent:
+        _remember(body)
+    return jsonify(body)
+
+
+# ---- Print history ----
+
+@app.route("/history", methods=["GET"])
+def list_history():
+    jobs = _archive.query(
+        since=request.args.get("since", type=float),
+        until=request.args.get("until", type=float),
+        list_id=request.args.get("list_id"),
+        payload_hash=request.args.get("hash"),
+        content_hash=request.args.get("content_hash"),
+        limit=request.args.get("limit", default=50, type=int),
+    )
+    return jsonify({"jobs": jobs})
+
+
+@app.route("/reprint/<job_id>", methods=["POST"])
+@_deduplicated("reprint", by_payload=False)
+def reprint(job_id):
+    bmp_data = _archive.get_bmp(job_id)
+    if bmp_data is None:
+        return jsonify({"error": "Job not found."}), 404
+
+    client_id = _client_id()
+    limited = _rate_limited(client_id)
+    if limited is not None:
+        return limited
+
+    # The archived BMP is exactly what was printed; send it without re-rendering.
+    sent = False
+    try:
+        with _print_queue.slot(client_id, timeout=config.PRINT_TIMEOUT_SECONDS):
+            send_job_sync(_printer, bmp_data)
+        sent = True
+    except Exception as exc:
+        app.logger.warning("Reprint failed: %s", exc)
+
+    body = {"history_id": job_id, "sent_to_printer": sent}
+    if sent:
+        _remember(body)
+    return jsonify(body)
+
+
+# ---- Profiling debug endpoints (only when profiling is enabled) ----
+
+@app.route("/debug/profiles", methods=["GET"])
+def list_profiles():
+    if not _profiler.enabled:
+        return jsonify({"error": "Profiling is disabled."}), 404
+    return jsonify({"profiles": _profiler.list_profiles()})
+
+
+@app.route("/debug/profiles/<job_id>", methods=["GET"])
+def get_profile(job_id):
+    if not _profiler.enabled:
+        return jsonify({"error": "Profiling is disabled."}), 404
+    summary = _profiler.load_profile(job_id)
+    if summary is None:
+        return jsonify({"error": "Profile not found."}), 404
+    return jsonify(summary)
@@ -0,0 +1,97 @@
+"""Benchmark render + encode throughput for each quality profile.
+
+Usage: python bench.py [--notes N] [--link-kbps K]
+
+Prints, per profile, the mean render and encode time, the printer BMP size,
+the estimated transfer time over a K kbit/s link, and notes per second for
+render + encode.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Config requires these; the benchmark never talks to a printer.
+os.environ.setdefault("PRINTER_IP", "127.0.0.1")
+os.environ.setdefault("PRINTER_PORT", "631")
+os.environ.setdefault("TEMP_IMAGE_DIR", os.path.join(tempfile.gettempdir(), "sticky-bench"))
+
+from app.config import config  # noqa: E402
+from app.printing.transport import encode_printer_bmp, to_printer_raster  # noqa: E402
+from app.quality import apply_profile, load_profiles  # noqa: E402
+from app.rendering.grocery_note import render_grocery_note  # noqa: E402
+
+PAYLOAD = {
+    "title": "Weekly Groceries",
+    "areas": [
+        {
+            "name": "Produce",
+            "items": [
+                {"qty": "2", "unit": "lb", "name": "onions", "note": "yellow"},
+                {"qty": "1", "unit": "bunch", "name": "cilantro"},
+                {"qty": "6", "unit": "", "name": "limes"},
+                {"qty": "3", "unit": "", "name": "avocados", "note": "ripe tomorrow, not today"},
+            ],
+        },
+        {
+            "name": "Dairy",
+            "items": [
+                {"qty": "1", "unit": "gal", "name": "milk", "note": "whole"},
+                {"qty": "8", "unit": "oz", "name": "sour cream"},
+            ],
+        },
+        {
+            "name": "Pantry",
+            "items": [
+                {"qty": "2", "unit": "can", "name": "black beans"},
+                {"qty": "1", "unit": "bag", "name": "tortilla chips", "note": "the big one"},
+            ],
+        },
+    ],
+    "footer": "Food Ops — List #3",
+}
+
+
+def bench_profile(profile, notes):
+    payload = apply_profile(PAYLOAD, profile)
+    # Warm font and asset caches so steady-state cost is measured.
+    render_grocery_note(payload, scale=profile.render_scale, font_scale=profile.font_scale)
+
+    render_s = encode_s = 0.0
+    size = 0
+    for _ in range(notes):
+        t0 = time.perf_counter()
+        img = render_grocery_note(payload, scale=profile.render_scale, font_scale=profile.font_scale)
+        t1 = time.perf_counter()
+        data = encode_printer_bmp(to_printer_raster(img, dither=profile.dither), dither=profile.dither)
+        t2 = time.perf_counter()
+        render_s += t1 - t0
+        encode_s += t2 - t1
+        size = len(data)
+    return render_s / notes, encode_s / notes, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=50, help="notes rendered per profile")
+    parser.add_argument("--link-kbps", type=float, default=1000.0, help="printer link speed for transfer estimate")
+    args = parser.parse_args(argv)
+
+    profiles = load_profiles(config.QUALITY_PROFILES)
+    print(f"{'profile':<10} {'render ms':>10} {'encode ms':>10} {'bmp KiB':>8} {'xfer ms':>8} {'notes/s':>8}")
+    for profile in profiles.values():
+        if profile.encoder != "native":
+            print(f"{profile.name:<10} (skipped: {profile.encoder} encoder)")
+            continue
+        render, encode, size = bench_profile(profile, args.notes)
+        transfer_ms = size * 8 / args.link_kbps
+        print(
+            f"{profile.name:<10} {render * 1000:>10.2f} {encode * 1000:>10.2f} "
+            f"{size / 1024:>8.1f} {transfer_ms:>8.1f} {1 / (render + encode):>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
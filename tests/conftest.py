@@ -1,6 +1,8 @@
 import os
 import sys
 
+import pytest
+
 # Ensure the project root is on sys.path so `app` is importable.
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
@@ -8,3 +10,42 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 os.environ.setdefault("PRINTER_IP", "127.0.0.1")
 os.environ.setdefault("PRINTER_PORT", "631")
 os.environ.setdefault("TEMP_IMAGE_DIR", "/tmp/sticky-test")
+
+
+class FakeClock:
+    """Manually advanced stand-in for ``time.monotonic``."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Flask test client with printing stubbed out and per-test state.
+
+    Documents "sent" to the printer are recorded in ``client.sent``.
+    """
+    from app import app, routes
+    from app.history import PrintArchive
+
+    sent = []
+    monkeypatch.setattr(routes.config, "TEMP_IMAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(routes, "_archive", PrintArchive(str(tmp_path / "history"), max_bytes=1 << 20))
+    monkeypatch.setattr(routes, "send_job_sync", lambda transport, data: sent.append(data))
+    routes._idempotency.clear()
+    routes._recent_payloads.clear()
+    routes._rate_limiter.clear()
+    test_client = app.test_client()
+    test_client.sent = sent
+    yield test_client
+    routes._idempotency.clear()
+    routes._recent_payloads.clear()
+    routes._rate_limiter.clear()
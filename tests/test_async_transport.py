@@ -0,0 +1,178 @@
+"""Tests for the asyncio IPP transport against a local fake IPP server."""
+
+import asyncio
+import struct
+import threading
+
+import pytest
+
+from app.printing.async_transport import (
+    AsyncIppTransport,
+    decode_response,
+    encode_print_job,
+    send_job_sync,
+)
+
+
+class FakeIppServer:
+    """Minimal IPP printer running on its own event loop thread."""
+
+    def __init__(self, status=0x0000, delay=0.0):
+        self.status = status
+        self.delay = delay
+        self.jobs = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._handle, "127.0.0.1", 0), self._loop
+        ).result()
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+    async def _shutdown(self):
+        self._server.close()
+        handlers = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    async def _handle(self, reader, writer):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await reader.readline()  # request line
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                key, _, value = line.decode().partition(":")
+                if key.lower() == "content-length":
+                    length = int(value)
+            body = await reader.readexactly(length)
+            request_id = struct.unpack_from(">I", body, 4)[0]
+            _, attrs = decode_response(body)
+            document = body[body.index(b"\x03", 8) + 1 :]
+            self.jobs.append((attrs, document))
+            await asyncio.sleep(self.delay)
+
+            reply = (
+                struct.pack(">BBHI", 2, 0, self.status, request_id)
+                + b"\x01"
+                + _attr(0x47, "attributes-charset", b"utf-8")
+                + b"\x02"
+                + _attr(0x21, "job-id", struct.pack(">i", len(self.jobs)))
+                + b"\x03"
+            )
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/ipp\r\n"
+                + f"Content-Length: {len(reply)}\r\n\r\n".encode()
+                + reply
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.in_flight -= 1
+            writer.close()
+
+
+def _attr(tag, name, value):
+    name = name.encode()
+    return struct.pack(">BH", tag, len(name)) + name + struct.pack(">H", len(value)) + value
+
+
+def test_encode_print_job_attributes():
+    msg = encode_print_job("ipp://p:631/ipp/print", b"DOC", request_id=7)
+    assert struct.unpack_from(">BBHI", msg) == (2, 0, 0x0002, 7)
+    _, attrs = decode_response(msg)
+    assert attrs["printer-uri"] == "ipp://p:631/ipp/print"
+    assert attrs["document-format"] == "image/reverse-encoding-bmp"
+    assert msg.endswith(b"\x03DOC")
+
+
+def test_send_job_returns_job_id():
+    with FakeIppServer() as server:
+        transport = AsyncIppTransport("127.0.0.1", server.port)
+        job_id = asyncio.run(transport.send_job(b"BMDATA"))
+    assert job_id == 1
+    attrs, document = server.jobs[0]
+    assert document == b"BMDATA"
+    assert attrs["requesting-user-name"] == "sticky-note-printer"
+
+
+def test_error_status_raises():
+    with FakeIppServer(status=0x0400) as server:
+        transport = AsyncIppTransport("127.0.0.1", server.port)
+        with pytest.raises(RuntimeError, match="0x0400"):
+            asyncio.run(transport.send_job(b"x"))
+
+
+def test_timeout():
+    with FakeIppServer(delay=1.0) as server:
+        transport = AsyncIppTransport("127.0.0.1", server.port, timeout=0.1)
+        with pytest.raises(TimeoutError):
+            asyncio.run(transport.send_job(b"x"))
+
+
+def test_timeout_covers_waiting_for_a_slot():
+    with FakeIppServer(delay=1.0) as server:
+        transport = AsyncIppTransport("127.0.0.1", server.port, max_in_flight=1)
+
+        async def queued_behind_slow_job():
+            slow = asyncio.create_task(transport.send_job(b"slow"))
+            await asyncio.sleep(0.05)
+            try:
+                with pytest.raises(TimeoutError):
+                    await transport.send_job(b"queued", timeout=0.1)
+            finally:
+                slow.cancel()
+
+        asyncio.run(queued_behind_slow_job())
+    assert len(server.jobs) == 1
+
+
+def test_concurrency_limit():
+    with FakeIppServer(delay=0.05) as server:
+        transport = AsyncIppTransport("127.0.0.1", server.port, max_in_flight=2)
+
+        async def burst():
+            return await asyncio.gather(*(transport.send_job(b"x") for _ in range(6)))
+
+        results = asyncio.run(burst())
+    assert len(results) == 6
+    assert server.max_in_flight == 2
+
+
+def test_cancellation_releases_slot():
+    with FakeIppServer(delay=0.5) as server:
+        transport = AsyncIppTransport("127.0.0.1", server.port, max_in_flight=1)
+
+        async def cancel_then_send():
+            task = asyncio.create_task(transport.send_job(b"slow"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            server.delay = 0.0
+            return await transport.send_job(b"fast")
+
+        assert asyncio.run(cancel_then_send()) is not None
+
+
+def test_send_job_sync():
+    with FakeIppServer() as server:
+        transport = AsyncIppTransport("127.0.0.1", server.port)
+        assert send_job_sync(transport, b"sync") == 1
+    assert server.jobs[0][1] == b"sync"
@@ -0,0 +1,73 @@
+"""Tests for font fallback chains and cmap coverage."""
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from app.rendering.fonts import FontChain, load_chain, read_cmap
+from app.rendering.grocery_note import _draw_checkbox
+from app.rendering.text_layout import measure
+
+
+@pytest.fixture
+def dejavu():
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", 20)
+    except Exception:
+        pytest.skip("DejaVuSans.ttf not installed")
+
+
+@pytest.fixture
+def default_font():
+    return ImageFont.load_default(20)
+
+
+@pytest.fixture
+def draw():
+    return ImageDraw.Draw(Image.new("1", (200, 40), 1))
+
+
+def test_read_cmap_reports_real_coverage(dejavu):
+    with open(dejavu.path, "rb") as fh:
+        coverage = read_cmap(fh.read())
+    assert ord("A") in coverage
+    assert ord("☐") in coverage
+    assert ord("日") not in coverage
+
+
+def test_default_font_does_not_claim_tofu_glyphs(default_font):
+    chain = FontChain([default_font])
+    assert chain.font_for("A") is default_font
+    # The built-in font draws a tofu box for this, which has nonzero width.
+    assert chain.font_for("☐") is None
+
+
+def test_runs_pick_first_covering_font(dejavu, default_font):
+    chain = FontChain([default_font, dejavu])
+    runs = chain.runs("eggs ☐ milk")
+    assert [text for text, _ in runs] == ["eggs ", "☐ ", "milk"]
+    assert [font for _, font in runs] == [default_font, dejavu, default_font]
+
+
+def test_uncovered_characters_use_primary(default_font):
+    chain = FontChain([default_font])
+    assert chain.runs("a日b") == [("a日b", default_font)]
+
+
+def test_measure_chain_matches_single_font(dejavu, draw):
+    chain = FontChain([dejavu])
+    assert measure("Milk", chain, draw) == measure("Milk", dejavu, draw)
+
+
+def test_checkbox_drawn_manually_without_glyph(default_font, draw):
+    width = _draw_checkbox(draw, 0, 0, 20, False, FontChain([default_font]))
+    assert width == 16 + 6
+
+
+def test_load_chain_is_cached():
+    assert load_chain(20) is load_chain(20)
+    assert load_chain(20) is not load_chain(20, bold=True)
+
+
+def test_regular_chain_has_no_bold_face():
+    paths = [getattr(font, "path", "") for font in load_chain(20).fonts]
+    assert not any("Bold" in str(path) for path in paths)
@@ -179,3 +179,16 @@ def test_save_artifact(tmp_path):
     out = tmp_path / "grocery_test.png"
     img.save(str(out))
     assert out.exists()
+
+
+def test_static_elements_are_cached():
+    """Rendering the same note twice reuses the cached header bitmaps."""
+    from app.rendering import assets
+
+    assets.clear()
+    render_grocery_note(SAMPLE_PAYLOAD)
+    misses = assets.header_bar.cache_info().misses
+    render_grocery_note(SAMPLE_PAYLOAD)
+    info = assets.header_bar.cache_info()
+    assert info.misses == misses
+    assert info.hits >= 2
@@ -0,0 +1,133 @@
+"""Tests for the print history archive and reprint endpoint."""
+
+import os
+
+from app import routes
+from app.history import PrintArchive, canonical_payload_hash
+
+
+def _bmp(n):
+    # Mostly-blank raster, like a real note: compresses well.
+    return b"BM" + bytes([n]) + b"\xff" * 4000
+
+
+class TestPrintArchive:
+    def test_append_and_fetch(self, tmp_path):
+        archive = PrintArchive(str(tmp_path), max_bytes=1 << 20)
+        meta = archive.append({"title": "Groceries"}, _bmp(1), list_id="weekly")
+        assert archive.get_bmp(meta["id"]) == _bmp(1)
+        assert archive.get(meta["id"])["payload"] == {"title": "Groceries"}
+        assert archive.get_bmp("missing") is None
+
+    def test_raster_is_stored_compressed(self, tmp_path):
+        archive = PrintArchive(str(tmp_path), max_bytes=1 << 20)
+        archive.append({}, _bmp(1))
+        assert archive.total_bytes() < len(_bmp(1)) // 4
+
+    def test_query_indexes(self, tmp_path):
+        archive = PrintArchive(str(tmp_path), max_bytes=1 << 20)
+        a = archive.append({}, _bmp(1), list_id="weekly")
+        b = archive.append({}, _bmp(2), list_id="party")
+        c = archive.append({}, _bmp(1), list_id="weekly")
+
+        assert [j["id"] for j in archive.query()] == [c["id"], b["id"], a["id"]]
+        assert [j["id"] for j in archive.query(list_id="weekly")] == [c["id"], a["id"]]
+        assert [j["id"] for j in archive.query(content_hash=a["content_hash"])] == [c["id"], a["id"]]
+        assert [j["id"] for j in archive.query(since=b["created"], until=b["created"])] == [b["id"]]
+        assert len(archive.query(limit=1)) == 1
+        assert "payload" not in archive.query()[0]
+
+    def test_payload_hash_ignores_quality_and_raster(self, tmp_path):
+        archive = PrintArchive(str(tmp_path), max_bytes=1 << 20)
+        a = archive.append({"title": "x", "options": {"quality": "draft"}}, _bmp(1))
+        b = archive.append({"title": "x", "options": {"quality": "high"}}, _bmp(2))
+        archive.append({"title": "y"}, _bmp(1))
+
+        assert a["payload_hash"] == canonical_payload_hash({"title": "x"})
+        assert [j["id"] for j in archive.query(payload_hash=a["payload_hash"])] == [b["id"], a["id"]]
+
+    def test_index_rebuilt_on_reopen(self, tmp_path):
+        archive = PrintArchive(str(tmp_path), max_bytes=1 << 20)
+        meta = archive.append({"title": "x"}, _bmp(3), list_id="weekly")
+
+        reopened = PrintArchive(str(tmp_path), max_bytes=1 << 20)
+        assert reopened.get_bmp(meta["id"]) == _bmp(3)
+        assert [j["id"] for j in reopened.query(list_id="weekly")] == [meta["id"]]
+
+    def test_torn_tail_is_discarded(self, tmp_path):
+        archive = PrintArchive(str(tmp_path), max_bytes=1 << 20)
+        meta = archive.append({}, _bmp(1))
+        segment = os.path.join(str(tmp_path), "segment-00000000.log")
+        with open(segment, "ab") as fh:
+            fh.write(b"\x00\x00\x01")
+
+        reopened = PrintArchive(str(tmp_path), max_bytes=1 << 20)
+        later = reopened.append({}, _bmp(2))
+        again = PrintArchive(str(tmp_path), max_bytes=1 << 20)
+        assert again.get_bmp(meta["id"]) == _bmp(1)
+        assert again.get_bmp(later["id"]) == _bmp(2)
+
+    def test_oldest_segments_evicted_over_cap(self, tmp_path):
+        archive = PrintArchive(str(tmp_path), max_bytes=4096, segment_bytes=1024)
+        ids = [archive.append({"n": i}, os.urandom(600))["id"] for i in range(20)]
+        assert archive.total_bytes() <= 4096
+        assert archive.get(ids[0]) is None
+        assert archive.get_bmp(ids[-1]) is not None
+        assert len(archive.query(limit=100)) < 20
+
+
+PAYLOAD = {"title": "Reprint me", "list_id": "weekly", "areas": [{"name": "Dairy", "items": [{"name": "milk"}]}]}
+
+
+def test_history_and_reprint(client, monkeypatch):
+    resp = client.post("/print/grocery", json=PAYLOAD)
+    history_id = resp.get_json()["history_id"]
+    assert history_id
+
+    jobs = client.get("/history?list_id=weekly").get_json()["jobs"]
+    assert [j["id"] for j in jobs] == [history_id]
+    assert jobs[0]["title"] == "Reprint me"
+
+    def fail_render(*args, **kwargs):
+        raise AssertionError("reprint must not re-render")
+
+    monkeypatch.setattr(routes, "render_grocery_note", fail_render)
+    resp = client.post(f"/reprint/{history_id}")
+    assert resp.get_json() == {"history_id": history_id, "sent_to_printer": True}
+    assert client.sent[1] == client.sent[0]
+
+    # Reprints are not archived again.
+    assert len(client.get("/history").get_json()["jobs"]) == 1
+
+
+def test_reprint_unknown_job(client):
+    assert client.post("/reprint/nope").status_code == 404
+
+
+def test_history_finds_reprints_of_the_same_list_by_payload_hash(client, monkeypatch):
+    monkeypatch.setattr(routes, "_recent_payloads", routes.IdempotencyStore(ttl_seconds=0, max_entries=1))
+    client.post("/print/grocery", json=PAYLOAD)
+    client.post("/print/grocery", json={**PAYLOAD, "options": {"quality": "draft"}})
+
+    digest = canonical_payload_hash(PAYLOAD)
+    assert len(client.get(f"/history?hash={digest}").get_json()["jobs"]) == 2
+
+
+def test_tasks_archives_the_raster_it_read_before_printing(client, monkeypatch):
+    def render(png_path, bmp_path):
+        with open(bmp_path, "wb") as fh:
+            fh.write(_bmp(1))
+        return True
+
+    def print_then_clobber(bmp_path):
+        # A concurrent request overwrites the shared temp file.
+        with open(bmp_path, "wb") as fh:
+            fh.write(_bmp(2))
+        return True
+
+    monkeypatch.setattr(routes, "make_image_from_list", lambda tasks, path: None)
+    monkeypatch.setattr(routes, "render_printable_bmp", render)
+    monkeypatch.setattr(routes, "print_image", print_then_clobber)
+
+    history_id = client.post("/print/tasks", json={"tasks": ["a"]}).get_json()["history_id"]
+    assert routes._archive.get_bmp(history_id) == _bmp(1)
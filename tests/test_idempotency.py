@@ -0,0 +1,188 @@
+"""Tests for print-request deduplication."""
+
+import threading
+import time
+
+import pytest
+
+from app import routes
+from app.idempotency import ACQUIRED, CONFLICT, IN_PROGRESS, REPLAY, IdempotencyStore, payload_hash, request_key
+
+
+class TestIdempotencyStore:
+    def test_claim_complete_replay(self):
+        store = IdempotencyStore(ttl_seconds=10, max_entries=4)
+        assert store.claim("a", "h").status == ACQUIRED
+        store.complete("a", {"ok": True})
+        assert store.claim("a", "h") == (REPLAY, {"ok": True})
+
+    def test_fingerprint_mismatch_conflicts(self):
+        store = IdempotencyStore(ttl_seconds=10, max_entries=4)
+        store.claim("a", "h1")
+        assert store.claim("a", "h2").status == CONFLICT
+        store.complete("a", 1)
+        assert store.claim("a", "h2").status == CONFLICT
+
+    def test_release_lets_the_key_be_retried(self):
+        store = IdempotencyStore(ttl_seconds=10, max_entries=4)
+        store.claim("a", "h")
+        store.release("a")
+        assert store.claim("a", "h").status == ACQUIRED
+
+    def test_duplicate_waits_for_the_original(self):
+        store = IdempotencyStore(ttl_seconds=10, max_entries=4)
+        store.claim("a", "h")
+        threading.Timer(0.05, store.complete, args=("a", 1)).start()
+        assert store.claim("a", "h") == (REPLAY, 1)
+
+    def test_duplicate_gives_up_after_wait(self):
+        store = IdempotencyStore(ttl_seconds=10, max_entries=4, wait_seconds=0.01)
+        store.claim("a", "h")
+        assert store.claim("a", "h").status == IN_PROGRESS
+
+    def test_entries_expire(self, fake_clock):
+        clock = fake_clock
+        store = IdempotencyStore(ttl_seconds=10, max_entries=4, clock=clock)
+        store.claim("a", "h")
+        store.complete("a", 1)
+        clock.now = 9.9
+        assert store.claim("a", "h").status == REPLAY
+        clock.now = 10.0
+        assert len(store) == 0
+        assert store.claim("a", "h").status == ACQUIRED
+
+    def test_oldest_evicted_when_full(self):
+        store = IdempotencyStore(ttl_seconds=10, max_entries=2)
+        for key in "abc":
+            store.claim(key, "h")
+            store.complete(key, key)
+        assert store.claim("a", "h").status == ACQUIRED
+        assert store.claim("b", "h") == (REPLAY, "b")
+        assert store.claim("c", "h") == (REPLAY, "c")
+
+    def test_disabled(self):
+        store = IdempotencyStore(ttl_seconds=0, max_entries=4)
+        store.claim("a", "h")
+        store.complete("a", 1)
+        assert store.claim("a", "h").status == ACQUIRED
+
+
+class TestRequestKey:
+    def test_header_wins(self):
+        assert request_key("grocery", "ip:10.0.0.1", "f00", "abc") == "grocery:ip:10.0.0.1:key:abc"
+
+    def test_payload_hash_ignores_key_order(self):
+        assert payload_hash({"a": 1, "b": 2}) == payload_hash({"b": 2, "a": 1})
+
+    def test_endpoints_do_not_collide(self):
+        fingerprint = payload_hash({"a": 1})
+        assert request_key("grocery", "ip:a", fingerprint, None) != request_key("tasks", "ip:a", fingerprint, None)
+
+    def test_clients_do_not_collide(self):
+        fingerprint = payload_hash({"a": 1})
+        assert request_key("grocery", "ip:a", fingerprint, "1") != request_key("grocery", "ip:b", fingerprint, "1")
+        assert request_key("grocery", "ip:a", fingerprint, None) != request_key("grocery", "ip:b", fingerprint, None)
+
+
+PAYLOAD = {"title": "Retry", "areas": [{"name": "Dairy", "items": [{"name": "milk"}]}]}
+
+
+def test_retry_with_same_payload_is_not_reprinted(client, monkeypatch):
+    renders = []
+    render = routes.render_grocery_note
+
+    def recording_render(*args, **kwargs):
+        renders.append(args)
+        return render(*args, **kwargs)
+
+    monkeypatch.setattr(routes, "render_grocery_note", recording_render)
+
+    first = client.post("/print/grocery", json=PAYLOAD)
+    second = client.post("/print/grocery", json=PAYLOAD)
+
+    assert first.status_code == second.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert len(renders) == 1
+    assert len(client.sent) == 1
+
+
+def test_same_payload_prints_again_after_window(client, monkeypatch):
+    monkeypatch.setattr(routes, "_recent_payloads", IdempotencyStore(ttl_seconds=0, max_entries=4))
+    client.post("/print/grocery", json=PAYLOAD)
+    client.post("/print/grocery", json=PAYLOAD)
+
+    assert len(client.sent) == 2
+
+
+def test_distinct_idempotency_keys_print_twice(client):
+    client.post("/print/grocery", json=PAYLOAD, headers={"Idempotency-Key": "one"})
+    client.post("/print/grocery", json=PAYLOAD, headers={"Idempotency-Key": "two"})
+    client.post("/print/grocery", json=PAYLOAD, headers={"Idempotency-Key": "one"})
+
+    assert len(client.sent) == 2
+
+
+def test_reused_key_with_different_payload_is_rejected(client):
+    headers = {"Idempotency-Key": "abc"}
+    client.post("/print/grocery", json=PAYLOAD, headers=headers)
+    resp = client.post("/print/grocery", json={**PAYLOAD, "title": "Other"}, headers=headers)
+
+    assert resp.status_code == 422
+    assert len(client.sent) == 1
+
+
+def test_concurrent_retries_print_once(client, monkeypatch):
+    sent = []
+
+    def slow_printer(transport, data):
+        time.sleep(0.2)
+        sent.append(data)
+
+    monkeypatch.setattr(routes, "send_job_sync", slow_printer)
+    responses = []
+
+    def post():
+        resp = client.post("/print/grocery", json=PAYLOAD, headers={"Idempotency-Key": "abc"})
+        responses.append(resp)
+
+    threads = [threading.Thread(target=post) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+
+    assert len(sent) == 1
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert sum(r.headers.get("Idempotent-Replayed") == "true" for r in responses) == 2
+
+
+@pytest.mark.parametrize("headers", [{}, {"Idempotency-Key": "1"}])
+def test_other_clients_are_not_deduplicated_against(client, headers):
+    kiosk_a = {"REMOTE_ADDR": "10.0.0.1"}
+    kiosk_b = {"REMOTE_ADDR": "10.0.0.2"}
+    client.post("/print/grocery", json=PAYLOAD, headers=headers, environ_base=kiosk_a)
+    other = {**PAYLOAD, "title": "Other"} if headers else PAYLOAD
+    resp = client.post("/print/grocery", json=other, headers=headers, environ_base=kiosk_b)
+
+    assert resp.status_code == 200
+    assert "Idempotent-Replayed" not in resp.headers
+    assert len(client.sent) == 2
+
+
+@pytest.mark.parametrize("headers", [{}, {"Idempotency-Key": "abc"}])
+def test_failed_print_is_not_cached(client, monkeypatch, headers):
+    sends = []
+
+    def offline(transport, data):
+        sends.append(data)
+        raise RuntimeError("offline")
+
+    monkeypatch.setattr(routes, "send_job_sync", offline)
+
+    first = client.post("/print/grocery", json=PAYLOAD, headers=headers)
+    second = client.post("/print/grocery", json=PAYLOAD, headers=headers)
+
+    assert first.get_json()["sent_to_printer"] is False
+    assert "Idempotent-Replayed" not in second.headers
+    assert len(sends) == 2
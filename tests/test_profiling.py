@@ -0,0 +1,106 @@
+"""Tests for opt-in request profiling."""
+
+from flask import Flask, jsonify
+
+from app.profiling import PROFILE_ID_HEADER, Profiler
+
+
+def _make_app(profiler):
+    test_app = Flask(__name__)
+
+    @test_app.route("/work", methods=["POST"])
+    @profiler.profiled
+    def work():
+        data = [str(i) * 10 for i in range(5000)]
+        return jsonify({"n": len(data)})
+
+    return test_app
+
+
+def test_disabled_profiler_returns_view_unchanged(tmp_path):
+    profiler = Profiler(str(tmp_path))
+
+    def view():
+        return "ok"
+
+    assert profiler.profiled(view) is view
+
+
+def test_header_triggers_profile(tmp_path):
+    profiler = Profiler(str(tmp_path), allow_header=True, top_n=5)
+    client = _make_app(profiler).test_client()
+
+    plain = client.post("/work")
+    assert plain.status_code == 200
+    assert PROFILE_ID_HEADER not in plain.headers
+
+    resp = client.post("/work", headers={"X-Profile": "1"})
+    assert resp.status_code == 200
+    assert resp.get_json() == {"n": 5000}
+    job_id = resp.headers[PROFILE_ID_HEADER]
+
+    assert (tmp_path / "profiles" / f"{job_id}.prof").exists()
+    summary = profiler.load_profile(job_id)
+    assert summary["endpoint"] == "/work"
+    assert 0 < len(summary["top_functions"]) <= 5
+    assert len(summary["top_allocations"]) <= 5
+    assert [p["job_id"] for p in profiler.list_profiles()] == [job_id]
+
+
+def test_sampling(tmp_path):
+    profiler = Profiler(str(tmp_path), sample_rate=0.5, rng=iter([0.9, 0.1]).__next__)
+    client = _make_app(profiler).test_client()
+
+    assert PROFILE_ID_HEADER not in client.post("/work").headers
+    assert PROFILE_ID_HEADER in client.post("/work").headers
+
+
+def test_old_profiles_pruned(tmp_path):
+    profiler = Profiler(str(tmp_path), allow_header=True, max_kept=2)
+    client = _make_app(profiler).test_client()
+    for _ in range(4):
+        client.post("/work", headers={"X-Profile": "1"})
+    assert len(profiler.list_profiles()) == 2
+    assert len(list((tmp_path / "profiles").glob("*.prof"))) == 2
+
+
+def test_load_profile_rejects_bad_ids(tmp_path):
+    profiler = Profiler(str(tmp_path), allow_header=True)
+    assert profiler.load_profile("../../etc/passwd") is None
+    assert profiler.load_profile("0" * 32) is None
+
+
+def test_summary_records_history_id(tmp_path):
+    profiler = Profiler(str(tmp_path), allow_header=True)
+    test_app = Flask(__name__)
+
+    @test_app.route("/print", methods=["POST"])
+    @profiler.profiled
+    def print_view():
+        return jsonify({"history_id": "ab" * 16})
+
+    resp = test_app.test_client().post("/print", headers={"X-Profile": "1"})
+    summary = profiler.load_profile(resp.headers[PROFILE_ID_HEADER])
+    assert summary["history_id"] == "ab" * 16
+
+
+def test_concurrent_request_runs_unprofiled_instead_of_waiting(tmp_path):
+    profiler = Profiler(str(tmp_path), allow_header=True)
+    client = _make_app(profiler).test_client()
+
+    with profiler._lock:  # another request is being profiled
+        resp = client.post("/work", headers={"X-Profile": "1"})
+    assert resp.status_code == 200
+    assert PROFILE_ID_HEADER not in resp.headers
+
+
+def test_save_errors_do_not_fail_the_request(tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")  # profiles/ can't be created under a file
+    profiler = Profiler(str(blocker), allow_header=True)
+    client = _make_app(profiler).test_client()
+
+    resp = client.post("/work", headers={"X-Profile": "1"})
+    assert resp.status_code == 200
+    assert resp.get_json() == {"n": 5000}
+    assert PROFILE_ID_HEADER not in resp.headers
@@ -0,0 +1,97 @@
+"""Tests for print-quality/speed profiles."""
+
+import pytest
+from PIL import Image
+
+from app.config import config
+from app.printing.transport import PRINTER_WIDTH_PX, encode_printer_bmp, to_printer_raster
+from app.quality import QualityProfile, apply_profile, load_profiles
+from app.rendering.grocery_note import render_grocery_note
+
+
+def test_configured_profiles_load():
+    profiles = load_profiles(config.QUALITY_PROFILES)
+    assert {"draft", "standard", "high"} <= set(profiles)
+    assert config.DEFAULT_QUALITY_PROFILE in profiles
+
+
+def test_unknown_default_profile_rejected():
+    with pytest.raises(ValueError, match="ultra"):
+        load_profiles(config.QUALITY_PROFILES, default="ultra")
+
+
+def test_unknown_encoder_rejected():
+    with pytest.raises(ValueError):
+        load_profiles({"bad": {"encoder": "gif"}})
+
+
+def test_apply_profile_respects_payload_line_gap():
+    profile = QualityProfile("draft", line_gap_px=3)
+    assert apply_profile({}, profile)["options"]["line_gap_px"] == 3
+    payload = {"options": {"line_gap_px": 9}}
+    assert apply_profile(payload, profile) is payload
+
+
+def test_render_scale_scales_width():
+    payload = {"areas": [{"name": "Dairy", "items": [{"name": "milk"}]}]}
+    assert render_grocery_note(payload, scale=0.5).width == 288
+    assert render_grocery_note(payload, scale=2.0).width == 1152
+
+
+def test_nearest_upscale_doubles_pixels():
+    small = Image.new("1", (PRINTER_WIDTH_PX // 2, 2), 1)
+    small.putpixel((0, 0), 0)
+    raster = to_printer_raster(small, dither=False)
+    assert raster.size == (PRINTER_WIDTH_PX, 4)
+    assert [raster.getpixel((x, y)) for x in (0, 1) for y in (0, 1)] == [0, 0, 0, 0]
+    assert raster.getpixel((2, 0)) != 0
+
+
+PAYLOAD = {
+    "title": "Weekly Groceries",
+    "areas": [
+        {
+            "name": "Produce",
+            "items": [
+                {"qty": "2", "unit": "lb", "name": "onions", "note": "yellow"},
+                {"qty": "1", "unit": "bunch", "name": "cilantro"},
+            ],
+        }
+    ],
+}
+
+
+def _print(client, quality):
+    payload = {**PAYLOAD, "options": {"quality": quality}}
+    return client.post("/print/grocery", json=payload)
+
+
+def test_draft_sends_fewer_bytes_than_standard(client):
+    assert _print(client, "standard").get_json()["quality"] == "standard"
+    assert _print(client, "draft").get_json()["quality"] == "draft"
+    standard, draft = client.sent
+    assert len(draft) < len(standard)
+
+
+def test_high_profile_prints_at_printer_width(client):
+    resp = _print(client, "high")
+    assert resp.get_json()["sent_to_printer"] is True
+    assert int.from_bytes(client.sent[0][18:22], "little") == PRINTER_WIDTH_PX
+
+
+@pytest.mark.parametrize("quality", ["ultra", ["draft"], {"name": "draft"}])
+def test_unknown_profile_is_rejected(client, quality):
+    resp = _print(client, quality)
+    assert resp.status_code == 400
+    assert client.sent == []
+
+
+def test_standard_matches_original_pipeline_for_narrow_notes(client):
+    payload = {**PAYLOAD, "options": {"width_px": 384}}
+    client.post("/print/grocery", json=payload)
+    assert client.sent == [encode_printer_bmp(render_grocery_note(payload))]
+
+
+def test_non_object_options_are_rejected(client):
+    resp = client.post("/print/grocery", json={**PAYLOAD, "options": "draft"})
+    assert resp.status_code == 400
@@ -0,0 +1,126 @@
+"""Tests for per-client rate limiting and fair printer queuing."""
+
+import threading
+import time
+
+import pytest
+
+from app import routes
+from app.ratelimit import FairPrintQueue, RateLimiter, parse_weights
+
+
+def test_parse_weights():
+    assert parse_weights("key:kiosk=4, ip:10.0.0.7=0.5,") == {"key:kiosk": 4.0, "ip:10.0.0.7": 0.5}
+    assert parse_weights("") == {}
+
+
+@pytest.mark.parametrize("spec", ["kiosk", "kiosk=", "=2", "kiosk=fast", "kiosk=0"])
+def test_parse_weights_rejects_malformed_entries(spec):
+    with pytest.raises(ValueError, match="CLIENT_WEIGHTS entry"):
+        parse_weights(spec)
+
+
+class TestRateLimiter:
+    def test_burst_then_reject(self, fake_clock):
+        limiter = RateLimiter(per_minute=60, burst=3, clock=fake_clock)
+        assert [limiter.check("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limiter.check("a") == pytest.approx(1.0)
+
+    def test_tokens_refill_over_time(self, fake_clock):
+        clock = fake_clock
+        limiter = RateLimiter(per_minute=60, burst=1, clock=clock)
+        assert limiter.check("a") == 0.0
+        assert limiter.check("a") > 0
+        clock.now = 1.0
+        assert limiter.check("a") == 0.0
+
+    def test_clients_are_independent(self, fake_clock):
+        limiter = RateLimiter(per_minute=60, burst=1, clock=fake_clock)
+        assert limiter.check("a") == 0.0
+        assert limiter.check("a") > 0
+        assert limiter.check("b") == 0.0
+
+    def test_disabled(self):
+        limiter = RateLimiter(per_minute=0, burst=1)
+        assert all(limiter.check("a") == 0.0 for _ in range(100))
+
+
+class TestFairPrintQueue:
+    def test_weighted_order_among_waiters(self):
+        queue = FairPrintQueue(weights={"heavy": 2.0})
+        order = []
+        hold = threading.Event()
+
+        # Occupy the printer so the remaining jobs all queue up.
+        def blocker():
+            with queue.slot("other"):
+                hold.wait()
+
+        def job(client):
+            with queue.slot(client):
+                order.append(client)
+
+        t0 = threading.Thread(target=blocker)
+        t0.start()
+        time.sleep(0.05)
+        # "light" submits a backlog before "heavy" shows up.
+        threads = []
+        for client in ["light"] * 3 + ["heavy"] * 4:
+            t = threading.Thread(target=job, args=(client,))
+            t.start()
+            threads.append(t)
+            time.sleep(0.01)
+        hold.set()
+        for t in [t0, *threads]:
+            t.join(timeout=5)
+
+        # heavy (weight 2) interleaves ahead of light's backlog instead of
+        # waiting behind it.
+        assert order[:3].count("heavy") >= 2
+        assert sorted(order) == sorted(["light"] * 3 + ["heavy"] * 4)
+
+    def test_wait_times_out(self):
+        queue = FairPrintQueue()
+        with queue.slot("a"):
+            with pytest.raises(TimeoutError):
+                with queue.slot("b", timeout=0.05):
+                    pass
+        # The timed-out job left the queue, so the printer is free again.
+        with queue.slot("c", timeout=0.05):
+            pass
+
+    def test_capacity_admits_concurrent_jobs(self):
+        queue = FairPrintQueue(capacity=2)
+        with queue.slot("a"):
+            with queue.slot("b", timeout=0.05):
+                with pytest.raises(TimeoutError):
+                    with queue.slot("c", timeout=0.05):
+                        pass
+
+    def test_released_on_exception(self):
+        queue = FairPrintQueue()
+        with pytest.raises(RuntimeError):
+            with queue.slot("a"):
+                raise RuntimeError("printer on fire")
+        with queue.slot("b"):
+            pass
+
+
+PAYLOAD = {"areas": [{"name": "Dairy", "items": [{"name": "milk"}]}]}
+
+
+def test_route_rejects_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(routes, "_rate_limiter", RateLimiter(per_minute=60, burst=2))
+    monkeypatch.setattr(routes, "_trusted_api_keys", frozenset({"kiosk"}))
+    for i in range(2):
+        resp = client.post("/print/grocery", json={**PAYLOAD, "title": str(i)})
+        assert resp.status_code == 200
+
+    # Untrusted API keys are ignored, so rotating them doesn't reset the limit.
+    resp = client.post("/print/grocery", json={**PAYLOAD, "title": "x"}, headers={"X-API-Key": "fresh"})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+    # A trusted key has its own bucket.
+    resp = client.post("/print/grocery", json=PAYLOAD, headers={"X-API-Key": "kiosk"})
+    assert resp.status_code == 200
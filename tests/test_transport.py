@@ -0,0 +1,41 @@
+"""Tests for the in-process printer BMP encoder."""
+
+import io
+import struct
+
+from PIL import Image, ImageChops, ImageDraw
+
+from app.printing.transport import PRINTER_WIDTH_PX, encode_printer_bmp, image_to_printer_bmp
+
+
+def _sample(width=PRINTER_WIDTH_PX, height=40):
+    img = Image.new("1", (width, height), 1)
+    ImageDraw.Draw(img).rectangle([4, 2, 60, 9], fill=0)
+    return img
+
+
+def test_header_is_1bit_bmp3():
+    data = encode_printer_bmp(_sample())
+    assert data[:2] == b"BM"
+    assert struct.unpack_from("<I", data, 2)[0] == len(data)
+    header_size, width, height, _, bpp = struct.unpack_from("<IiiHH", data, 14)
+    assert (header_size, width, height, bpp) == (40, PRINTER_WIDTH_PX, 40, 1)
+
+
+def test_pixels_are_vertically_flipped():
+    img = _sample()
+    decoded = Image.open(io.BytesIO(encode_printer_bmp(img)))
+    expected = img.transpose(Image.FLIP_TOP_BOTTOM)
+    assert ImageChops.difference(decoded.convert("L"), expected.convert("L")).getbbox() is None
+
+
+def test_narrow_image_is_scaled_to_printer_width():
+    decoded = Image.open(io.BytesIO(encode_printer_bmp(_sample(width=384, height=40))))
+    assert decoded.size == (PRINTER_WIDTH_PX, 60)
+    assert decoded.mode == "1"
+
+
+def test_image_to_printer_bmp_writes_file(tmp_path):
+    out = tmp_path / "note.bmp"
+    image_to_printer_bmp(_sample(), str(out))
+    assert out.read_bytes() == encode_printer_bmp(_sample())